@@ -1,3 +1,3 @@
-from .websocket import game_manager, setup_websocket
+from .websocket import sessions, setup_websocket
 
-__all__ = ['game_manager', 'setup_websocket']
\ No newline at end of file
+__all__ = ['sessions', 'setup_websocket']
\ No newline at end of file
@@ -0,0 +1,96 @@
+import asyncio
+from collections import deque
+from typing import Callable, Deque, Dict
+from fastapi import WebSocket
+
+class Connection:
+    """A spectator's websocket with its own bounded outbound queue and writer task."""
+
+    def __init__(self, websocket: WebSocket, max_queue: int):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.queue: Deque[str] = deque()
+        self.dropped_frames = 0
+        self.resyncs = 0
+        self._ready = asyncio.Event()
+        self._writer = asyncio.create_task(self._write())
+
+    def send(self, message: str):
+        """Queue a message without waiting for the client."""
+        self.queue.append(message)
+        self._ready.set()
+
+    def resync(self, snapshot: str):
+        """Replace everything still queued with a fresh snapshot."""
+        self.dropped_frames += len(self.queue)
+        self.resyncs += 1
+        self.queue.clear()
+        self.send(snapshot)
+
+    def close(self):
+        self._writer.cancel()
+
+    async def _write(self):
+        try:
+            while True:
+                await self._ready.wait()
+                while self.queue:
+                    await self.websocket.send_text(self.queue.popleft())
+                self._ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The receive loop notices the broken socket and disconnects it
+            print(f"WebSocket send failed: {e}")
+
+class Broadcaster:
+    """
+    Fans messages out to spectators without ever waiting on their network.
+
+    Every connection has a bounded queue drained by its own writer task. Deltas
+    only make sense in order, so a client that falls more than max_queue
+    messages behind has its backlog dropped and replaced by one snapshot of
+    the latest state.
+    """
+
+    def __init__(self, snapshot: Callable[[], str], max_queue: int = 32):
+        self.snapshot = snapshot
+        self.max_queue = max_queue
+        self.connections: Dict[WebSocket, Connection] = {}
+        # Totals from connections that have since left
+        self.dropped_frames = 0
+        self.resyncs = 0
+
+    def __len__(self) -> int:
+        return len(self.connections)
+
+    def add(self, websocket: WebSocket) -> Connection:
+        connection = Connection(websocket, self.max_queue)
+        self.connections[websocket] = connection
+        return connection
+
+    def remove(self, websocket: WebSocket):
+        connection = self.connections.pop(websocket, None)
+        if connection:
+            self.dropped_frames += connection.dropped_frames
+            self.resyncs += connection.resyncs
+            connection.close()
+
+    def publish(self, message: str):
+        snapshot = None
+        for connection in self.connections.values():
+            if len(connection.queue) < self.max_queue:
+                connection.send(message)
+            else:
+                # The snapshot already includes this message's changes
+                snapshot = snapshot or self.snapshot()
+                connection.resync(snapshot)
+
+    def metrics(self) -> Dict:
+        depths = [len(connection.queue) for connection in self.connections.values()]
+        return {
+            "droppedFrames": self.dropped_frames + sum(c.dropped_frames for c in self.connections.values()),
+            "resyncs": self.resyncs + sum(c.resyncs for c in self.connections.values()),
+            "queueDepth": sum(depths),
+            "maxQueueDepth": max(depths, default=0)
+        }
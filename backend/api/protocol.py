@@ -0,0 +1,57 @@
+"""
+Websocket message protocol.
+
+Clients get one full snapshot when they connect (or ask with get_state), then a
+delta after every turn listing what changed. Every delta carries a sequence
+number; a client that sees a gap should ask for a new snapshot.
+
+    {"type": "snapshot", "seq": 12, "state": {...GameState.to_dict()...}}
+    {"type": "delta", "seq": 13, "events": [
+        {"type": "play", "player": "red", "chip": "blue", "pile": 2},
+        {"type": "capture", "pile": 2, "player": "blue", "captured": "blue"},
+        {"type": "transfer", "from": "red", "to": "green", "chip": "red"},
+        {"type": "defeated", "player": "yellow"},
+        {"type": "turn", "player": "green"}
+    ]}
+
+A capture takes the top two chips off the pile; "captured" is the chip handed to
+the capturing player, or null if the capture rebounded and both left the game.
+"""
+import json
+from typing import Dict, List, Optional
+from game.models import Board, Move, PLAY, COLORS
+
+def turn_events(before: Board, after: Board, move: Optional[Move]) -> List[Dict]:
+    """Describe the changes from `before` to `after` made by one turn that executed `move`."""
+    events = []
+    player = COLORS[before.current].value
+
+    if move is not None:
+        action, chip, target = move
+        if action == PLAY:
+            events.append({"type": "play", "player": player, "chip": COLORS[chip].value, "pile": target})
+            removed = after.removed[chip] - before.removed[chip]
+            if removed:
+                events.append({
+                    "type": "capture",
+                    "pile": target,
+                    "player": COLORS[chip].value,
+                    "captured": COLORS[chip].value if removed == 1 else None
+                })
+        else:
+            events.append({"type": "transfer", "from": player, "to": COLORS[target].value,
+                           "chip": COLORS[chip].value})
+
+    for defeated in after.defeated[len(before.defeated):]:
+        events.append({"type": "defeated", "player": COLORS[defeated].value})
+
+    if after.current != before.current:
+        events.append({"type": "turn", "player": COLORS[after.current].value})
+
+    return events
+
+def encode_snapshot(seq: int, state: Dict) -> str:
+    return json.dumps({"type": "snapshot", "seq": seq, "state": state})
+
+def encode_delta(seq: int, events: List[Dict]) -> str:
+    return json.dumps({"type": "delta", "seq": seq, "events": events})
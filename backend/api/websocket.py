@@ -1,69 +1,202 @@
 import asyncio
 import json
+import os
+import time
+from typing import Dict, Optional
 from fastapi import WebSocket
-from game.engine import GameEngine
+from game import metrics
+from game.batching import local_batcher
+from game.engine import GameEngine, MAX_SEED
+from game.lineup import Lineup, LineupSpec, DEFAULT_LINEUP
+from game.providers import client_pool
+from game.replay import ReplayWriter
+from game.results import result_store, game_result
+from .broadcaster import Broadcaster
+from .protocol import turn_events, encode_snapshot, encode_delta
 
-class GameManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
+DEFAULT_GAME_ID = "default"
+REPLAY_DIR = os.getenv("REPLAY_DIR")  # Record every game here when set
+GAME_LINEUP = os.getenv("GAME_LINEUP", DEFAULT_LINEUP)  # Lineup for games started without one
+MAX_MCTS_SIMULATIONS = int(os.getenv("MAX_MCTS_SIMULATIONS", "5000"))  # Largest search budget clients may ask for
+
+class GameSession:
+    """One game and the websocket clients watching it."""
+
+    def __init__(self, game_id: str):
+        self.game_id = game_id
+        self.spectators = Broadcaster(self.snapshot)
         self.game: GameEngine = None
         self.game_task: asyncio.Task = None
+        self.lineup: Optional[Lineup] = None
+        self.seed: Optional[int] = None  # Replays a game exactly with the same lineup; random if None
+        self.move_delay: float = 1.0
+        self.seq = 0  # Sequence number of the last delta sent
+
+    @property
+    def running(self) -> bool:
+        return self.game_task is not None and not self.game_task.done()
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        connection = self.spectators.add(websocket)
+        if self.game:
+            connection.send(self.snapshot())
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        self.spectators.remove(websocket)
+
+    def send(self, websocket: WebSocket, message: str):
+        """Queue a message for one spectator."""
+        connection = self.spectators.connections.get(websocket)
+        if connection:
+            connection.send(message)
 
-    async def broadcast_state(self):
-        if not self.active_connections:
-            return
-            
-        state_dict = self.game.state.to_dict()
-        await asyncio.gather(
-            *[connection.send_json(state_dict) for connection in self.active_connections]
-        )
+    def snapshot(self) -> str:
+        return encode_snapshot(self.seq, self.game.state.to_dict())
 
     async def run_game(self):
-        self.game = GameEngine()
-        
+        try:
+            game = GameEngine(self.lineup.players(), seed=self.seed)
+        except Exception as e:
+            # E.g. a player's provider isn't configured; tell the spectators instead of failing silently
+            self.spectators.publish(json.dumps({"type": "error", "message": str(e)}))
+            return None
+        self.game = game
+        self.seq = 0
+        self.spectators.publish(self.snapshot())
+
+        recorder = None
+        if REPLAY_DIR:
+            os.makedirs(REPLAY_DIR, exist_ok=True)
+            recorder = ReplayWriter(os.path.join(REPLAY_DIR, f"{self.game_id}-{int(time.time())}.jsonl"))
+            recorder.start(self.game.state)
+            self.game.recorder = recorder
+
+        start = time.perf_counter()
+        try:
+            with metrics.profiled(f"{self.game_id}-{int(time.time())}"):
+                await self._play()
+        finally:
+            if recorder:
+                recorder.finish(self.game.get_winner())
+
+        if result_store:
+            result_store.record(game_result(self.game, "server", time.perf_counter() - start))
+
+        return self.game.get_winner()
+
+    async def _play(self):
         while not self.game._check_game_over():
-            current_player = self.game.state.players[self.game.state.current_turn]
-            
-            if not current_player.defeated:
-                try:
-                    move = await current_player.make_decision(self.game.state)
-                    self.game.execute_move(move)
-                    await self.broadcast_state()
-                    await asyncio.sleep(1)  # Add delay between moves
-                except Exception as e:
-                    print(f"Error during {current_player.color}'s turn: {e}")
-                    
-            self.game.update_turn()
-
-        winner = self.game.get_winner()
-        await self.broadcast_state()
-        return winner
-
-game_manager = GameManager()
+            before = self.game.state.board.copy()
+            await self.game.play_turn()
+
+            with metrics.broadcast_latency.time():
+                events = turn_events(before, self.game.state.board, self.game.last_move)
+                if events:
+                    self.seq += 1
+                    self.spectators.publish(encode_delta(self.seq, events))
+            await asyncio.sleep(self.move_delay)  # Give spectators time to follow the game
+
+class SessionRegistry:
+    """All game sessions in this process, keyed by game ID, each running as its own task."""
+
+    def __init__(self, max_games: int):
+        self.max_games = max_games
+        self.sessions: Dict[str, GameSession] = {}
+        self.lineups: Dict[str, Lineup] = {}  # Shared by every game with the same lineup, so players are reused
+
+    @property
+    def running_games(self) -> int:
+        return sum(1 for session in self.sessions.values() if session.running)
+
+    def get_or_create(self, game_id: str) -> GameSession:
+        if game_id not in self.sessions:
+            self.sessions[game_id] = GameSession(game_id)
+        return self.sessions[game_id]
+
+    def lineup(self, spec: LineupSpec) -> Lineup:
+        """The shared Lineup for a spec. Raises ValueError for bad specs or search budgets over the limit."""
+        lineup = Lineup(spec)
+        for color, (kind, arg) in lineup.seats.items():
+            if kind == "mcts" and arg and int(arg) > MAX_MCTS_SIMULATIONS:
+                raise ValueError(f"{color.value}: MCTS is limited to {MAX_MCTS_SIMULATIONS} simulations per move")
+        return self.lineups.setdefault(lineup.key, lineup)
+
+    def start(self, session: GameSession, lineup: Optional[LineupSpec] = None,
+              seed: Optional[int] = None) -> Optional[str]:
+        """Start a new game in the session. Returns an error message if it can't be started."""
+        if session.running:
+            return "A game is already running here; watch it or start one under another game ID"
+        if self.running_games >= self.max_games:
+            return f"Server is at its limit of {self.max_games} concurrent games"
+        if seed is not None and (not isinstance(seed, int) or not 0 <= seed < MAX_SEED):
+            return f"Seed must be a whole number from 0 to {MAX_SEED - 1}"
+        try:
+            session.lineup = self.lineup(lineup or GAME_LINEUP)
+        except ValueError as e:
+            return str(e)
+        session.seed = seed
+        session.game = None  # The previous game, if any, is over; run_game() sends the new one's snapshot
+        session.seq = 0
+
+        session.game_task = asyncio.create_task(session.run_game())
+        session.game_task.add_done_callback(lambda task: self._finished(session, task))
+        return None
+
+    def _finished(self, session: GameSession, task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            print(f"Game {session.game_id} failed: {task.exception()!r}")
+            session.spectators.publish(json.dumps({"type": "error", "message": f"Game failed: {task.exception()}"}))
+        self.discard_if_idle(session)
+
+    def discard_if_idle(self, session: GameSession):
+        """Forget a session once nobody is watching and its game is not running."""
+        if not session.spectators and not session.running:
+            self.sessions.pop(session.game_id, None)
+
+sessions = SessionRegistry(max_games=int(os.getenv("MAX_CONCURRENT_GAMES", "200")))
 
 def setup_websocket(app):
+    @app.get("/games")
+    async def list_games():
+        return {
+            "running": sessions.running_games,
+            "maxGames": sessions.max_games,
+            "modelClients": client_pool.stats(),
+            "localBatches": local_batcher.stats(),
+            "games": [{
+                "gameId": session.game_id,
+                "running": session.running,
+                "lineup": session.lineup.key if session.lineup else None,
+                "seed": session.game.seed if session.game else None,
+                "spectators": len(session.spectators),
+                **session.spectators.metrics()
+            } for session in sessions.sessions.values()]
+        }
+
     @app.websocket("/ws")
-    async def websocket_endpoint(websocket: WebSocket):
-        await game_manager.connect(websocket)
+    async def default_websocket_endpoint(websocket: WebSocket):
+        await websocket_endpoint(websocket, DEFAULT_GAME_ID)
+
+    @app.websocket("/ws/{game_id}")
+    async def websocket_endpoint(websocket: WebSocket, game_id: str):
+        session = sessions.get_or_create(game_id)
+        await session.connect(websocket)
         try:
             while True:
                 data = await websocket.receive_text()
                 command = json.loads(data)
-                
-                if command["type"] == "start_game" and not game_manager.game_task:
-                    game_manager.game_task = asyncio.create_task(game_manager.run_game())
-                    
-                elif command["type"] == "get_state" and game_manager.game:
-                    await websocket.send_json(game_manager.game.state.to_dict())
-                    
+
+                if command["type"] == "start_game":
+                    error = sessions.start(session, command.get("lineup"), command.get("seed"))
+                    if error:
+                        session.send(websocket, json.dumps({"type": "error", "message": error}))
+
+                elif command["type"] == "get_state" and session.game:
+                    session.send(websocket, session.snapshot())
+
         except Exception as e:
             print(f"WebSocket error: {e}")
         finally:
-            game_manager.disconnect(websocket)
\ No newline at end of file
+            session.disconnect(websocket)
+            sessions.discard_if_idle(session)
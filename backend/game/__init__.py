@@ -1,14 +1,38 @@
-from .models import PlayerColor, Chip, GameState
+from .models import PlayerColor, Chip, Pile, Board, GameState
 from .engine import GameEngine
-from .ai_players import AIPlayer, GPTPlayer, ClaudePlayer, LocalPlayer
+from .ai_players import AIPlayer, RequestPolicy, GPTPlayer, ClaudePlayer, LocalPlayer, RandomPlayer
+from .greedy import GreedyPlayer
+from .mcts import MCTSPlayer
+from .lineup import Lineup, register_player
+from .replay import ReplayWriter, ReplayReader
+from .cache import DecisionCache
 
 __all__ = [
     'PlayerColor',
     'Chip',
+    'Pile',
+    'Board',
     'GameState',
     'GameEngine',
     'AIPlayer',
+    'RequestPolicy',
     'GPTPlayer',
     'ClaudePlayer',
-    'LocalPlayer'
-]
\ No newline at end of file
+    'LocalPlayer',
+    'RandomPlayer',
+    'GreedyPlayer',
+    'MCTSPlayer',
+    'Lineup',
+    'register_player',
+    'ReplayWriter',
+    'ReplayReader',
+    'DecisionCache',
+    'VectorGames'
+]
+
+def __getattr__(name):
+    # NumPy is optional and slow to import, so the batch simulator loads on first use
+    if name == 'VectorGames':
+        from .vector import VectorGames
+        return VectorGames
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,41 +1,153 @@
-import os
+import asyncio
 import json
+import random
 import re
-from typing import Dict
-from openai import AsyncOpenAI
-from anthropic import AsyncAnthropic
-from .models import PlayerColor, GameState
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from .batching import local_batcher
+from . import metrics
+from .cache import DecisionCache, fingerprint, relabel_move, restore_move
+from .models import PlayerColor, GameState, Move, PLAY, COLOR_INDEX, encode_move, decode_move
+from .prompts import RULES, MAX_REPLY_TOKENS, MOVE_GRAMMAR, encode_state, expand_move, openai_response_format
+from .providers import client_pool, provider_limits, require_api_key, LOCAL_BASE_URL, LOCAL_GRAMMAR
+
+@dataclass(frozen=True)
+class RequestPolicy:
+    """
+    How long a player may take to decide.
+
+    deadline: seconds before the move is handed to the fallback player.
+    hedge_after: seconds before a duplicate request is sent, typically the provider's p95 latency.
+    fallback: player used when the deadline passes; a RandomPlayer of the same color if None.
+    """
+    deadline: Optional[float] = None
+    hedge_after: Optional[float] = None
+    fallback: Optional['AIPlayer'] = None
+
+# Per-provider defaults; built-in players have no provider and run unrestricted
+DEFAULT_POLICIES: Dict[str, RequestPolicy] = {
+    "openai": RequestPolicy(deadline=20.0, hedge_after=8.0),
+    "anthropic": RequestPolicy(deadline=20.0, hedge_after=8.0),
+    "local": RequestPolicy(deadline=10.0)
+}
 
 class AIPlayer:
-    def __init__(self, color: PlayerColor, model_type: str):
+    provider: Optional[str] = None
+
+    def __init__(self, color: PlayerColor, model_type: str, policy: Optional[RequestPolicy] = None):
         self.color = color
-        self.chips = []
         self.model_type = model_type
-        self.defeated = False
+        self.policy = policy or DEFAULT_POLICIES.get(self.provider, RequestPolicy())
+        self.cache: Optional[DecisionCache] = None  # Reuse decisions made in equivalent positions
+        self.rng = random.Random()  # Used for games without a seed
 
-    def _create_prompt(self, game_state: GameState) -> str:
-        return f"""You are playing a game of So Long Sucker as the {self.color.value} player.
+    def decision_rng(self, game_state: GameState) -> random.Random:
+        """
+        Randomness for one decision. In a seeded game it is derived from the
+        game's seed, this seat and the ply, so a decision is reproducible no
+        matter which process plays the game or how many games share the player.
+        """
+        if game_state.seed is None:
+            return self.rng
+        return random.Random(f"{game_state.seed}/{self.color.value}/{game_state.ply}")
+
+    async def decide(self, game_state: GameState) -> Dict:
+        """Decide on a move, answering from the decision cache when the position has been seen."""
+        if self.cache is None or self.provider is None:  # Built-in players decide faster than a lookup
+            return await self._decide(game_state)
+
+        key, relabel = fingerprint(game_state.board, COLOR_INDEX[self.color])
+        key = f"{self.model_type}|{key}"
+        cached = self.cache.get(key)
+        if cached is not None:
+            move = decode_move(restore_move(cached, relabel))
+            move["reasoning"] = "Cached decision"
+            return move
+
+        move = await self._decide(game_state)
+        if "raw" in move and not move.get("failed"):  # Only cache real model answers, not fallbacks or error moves
+            try:
+                self.cache.put(key, relabel_move(encode_move(move), relabel))
+            except (KeyError, ValueError):
+                pass
+        return move
+
+    async def _decide(self, game_state: GameState) -> Dict:
+        """make_decision under the player's request policy: deadline, hedged duplicate and fallback."""
+        policy = self.policy
+        if policy.deadline is None and policy.hedge_after is None:
+            return await self._request(game_state)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + policy.deadline if policy.deadline is not None else None
+        tasks = {asyncio.ensure_future(self._request(game_state))}
+        try:
+            if policy.hedge_after is not None and (deadline is None or policy.hedge_after < policy.deadline):
+                done, _ = await asyncio.wait(tasks, timeout=policy.hedge_after)
+                if not done:
+                    tasks.add(asyncio.ensure_future(self._request(game_state)))
+
+            timeout = max(0.0, deadline - loop.time()) if deadline is not None else None
+            done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if done:
+                return done.pop().result()
+        finally:
+            for task in tasks:
+                task.cancel()
 
-Rules:
-1. On your turn, you must either play a chip onto a pile or transfer a chip to another player
-2. You can play any chip you own (your color or prisoners)
-3. When chips of the same color are on top of a pile, they are captured by that color's player
-4. When all four colors are in a pile, the player whose chip is deepest gets the next move
+        print(f"{self.model_type} missed its {policy.deadline}s deadline, using fallback player")
+        fallback = policy.fallback or RandomPlayer(self.color)
+        fallback.rng = self.decision_rng(game_state)
+        return await fallback.make_decision(game_state)
 
-Current Game State:
-Your chips: {[c.color.value for c in self.chips]}
-Piles in play: {[[c.color.value for c in pile] for pile in game_state.piles]}
-Defeated players: {[p.value for p in game_state.defeated_players]}
+    async def _request(self, game_state: GameState) -> Dict:
+        """One make_decision call, counted against the provider's in-flight limit."""
+        async with provider_limits.slot(self.provider):
+            if self.provider is None:
+                return await self.make_decision(game_state)
+            with metrics.provider_latency.time(provider=self.provider, model=self.model_type):
+                return await self.make_decision(game_state)
 
-Provide your move decision in this exact format:
-{{
-    "action": "play",     // or "transfer"
-    "chip": "[color]",    // color of chip to play/transfer (red, blue, green, or yellow)
-    "target": "[number or color]",   // pile number (0-9) for play, or player color for transfer
-    "reasoning": "[brief explanation]"
-}}
+    async def make_decision(self, game_state: GameState) -> Dict:
+        """
+        Ask the model for a move. Model players implement _complete(); built-in
+        players override this method instead. The model's raw reply is kept
+        under "raw" for replays.
+        """
+        try:
+            return self._parse_reply(await self._complete(game_state), game_state)
+        except Exception as e:
+            print(f"Error during {self.color}'s turn with {self.model_type}: {e}")
+            metrics.provider_errors.inc(provider=self.provider, model=self.model_type)
+            return self._format_safe_move()
 
-Respond ONLY with a valid JSON object, no other text."""
+    def _parse_reply(self, text: str, game_state: GameState) -> Dict:
+        move = self._validate_move(expand_move(self._extract_json(text)), game_state)
+        move["raw"] = text
+        return move
+
+    async def _complete(self, game_state: GameState) -> str:
+        """Send the prompt to the model and return its reply text."""
+        raise NotImplementedError
+
+    async def replay_decision(self, record: Optional[Dict], game_state: GameState) -> Dict:
+        """
+        Decide as recorded in a game record's turn (see game.replay) instead of
+        asking the model: the recorded reply is parsed again, or where there was
+        none (a cached, fallback or failed decision), the recorded move is reused.
+        Built-in players have no provider and simply decide again.
+        """
+        if self.provider is None:
+            return await self.decide(game_state)
+        if record and record.get("raw") is not None:
+            return self._parse_reply(record["raw"], game_state)
+        if record and record.get("move"):
+            return decode_move(tuple(record["move"]))
+        return self._format_safe_move()
+
+    def _create_prompt(self, game_state: GameState) -> str:
+        """The per-turn part of the prompt. It follows prompts.RULES, which is the same for every turn."""
+        return encode_state(game_state, self.color)
 
     def _extract_json(self, text: str) -> Dict:
         """Extract JSON object from text, handling common formatting issues."""
@@ -47,6 +159,7 @@ Respond ONLY with a valid JSON object, no other text."""
             return json.loads(text)
         except Exception as e:
             print(f"JSON extraction failed: {e}")
+            metrics.parse_failures.inc(model=self.model_type)
             return self._format_safe_move()
 
     def _format_safe_move(self) -> Dict:
@@ -55,114 +168,162 @@ Respond ONLY with a valid JSON object, no other text."""
             "action": "play",
             "chip": self.color.value,
             "target": "0",
-            "reasoning": "Error occurred, making safe move"
+            "reasoning": "Error occurred, making safe move",
+            "failed": True  # Not the model's answer; kept out of the decision cache
         }
 
-    def _validate_move(self, move: Dict) -> Dict:
-        """Validate and fix move format if needed."""
+    def _validate_move(self, move: Dict, game_state: GameState) -> Dict:
+        """Validate the move, mapping it onto the nearest legal move if needed."""
         try:
             # Ensure all required fields exist
-            required_fields = {"action", "chip", "target", "reasoning"}
-            if not all(field in move for field in required_fields):
-                return self._format_safe_move()
-
-            # Validate action
-            if move["action"] not in ["play", "transfer"]:
-                move["action"] = "play"
-
-            # Validate chip color
-            valid_colors = {"red", "blue", "green", "yellow"}
-            if move["chip"] not in valid_colors:
-                move["chip"] = self.color.value
-
-            # Validate target
-            if move["action"] == "play":
-                try:
-                    # Ensure target is a valid pile number
-                    pile_num = int(str(move["target"]))
-                    move["target"] = str(min(max(0, pile_num), 9))
-                except (ValueError, TypeError):
-                    move["target"] = "0"
-            elif move["target"] not in valid_colors:
-                move["target"] = "0"
+            required_fields = {"action", "chip", "target"}
+            result = "ok"
+            if not isinstance(move, dict) or not all(field in move for field in required_fields):
+                move = self._format_safe_move()
+                result = "invalid"
 
-            return move
+            legal_moves = game_state.legal_moves(self.color)
+            if not legal_moves:
+                metrics.validations.inc(model=self.model_type, result=result)
+                return move
+
+            nearest = decode_move(self._nearest_legal_move(move, legal_moves))
+            if result == "ok" and any(str(move[field]).lower() != nearest[field] for field in required_fields):
+                result = "corrected"
+            metrics.validations.inc(model=self.model_type, result=result)
+            nearest["reasoning"] = str(move.get("reasoning", ""))
+            if move.get("failed"):
+                nearest["failed"] = True
+            return nearest
         except Exception as e:
             print(f"Move validation failed: {e}")
+            metrics.validations.inc(model=self.model_type, result="error")
             return self._format_safe_move()
 
+    def _nearest_legal_move(self, move: Dict, legal_moves: List[Move]) -> Move:
+        """
+        The legal move sharing the most with the requested one. Action counts
+        most, then chip, then target; ties go to the closest pile number.
+        """
+        action = str(move["action"]).lower()
+        chip = str(move["chip"]).lower()
+        target = str(move["target"]).lower()
+        try:
+            pile = int(target)
+        except ValueError:
+            pile = None
+
+        def score(candidate: Move):
+            decoded = decode_move(candidate)
+            matches = ((decoded["action"] == action) * 4 + (decoded["chip"] == chip) * 2
+                       + (decoded["target"] == target))
+            distance = abs(candidate[2] - pile) if candidate[0] == PLAY and pile is not None else 0
+            return matches, -distance
+
+        return max(legal_moves, key=score)
+
 class GPTPlayer(AIPlayer):
-    def __init__(self, color: PlayerColor):
-        super().__init__(color, "gpt-4")
-        self.client = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    provider = "openai"
 
-    async def make_decision(self, game_state: GameState) -> Dict:
-        try:
-            response = await self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[{
-                    "role": "system",
-                    "content": "You are an AI playing So Long Sucker. Provide moves in the specified JSON format."
-                }, {
-                    "role": "user",
-                    "content": self._create_prompt(game_state)
-                }],
-                temperature=0.7
-            )
-            move = self._extract_json(response.choices[0].message.content)
-            return self._validate_move(move)
-        except Exception as e:
-            print(f"Error during {self.color}'s turn: {e}")
-            return self._format_safe_move()
+    def __init__(self, color: PlayerColor, policy: Optional[RequestPolicy] = None, model: str = "gpt-4"):
+        super().__init__(color, model, policy)
+        self.model = model
+        self.api_key = require_api_key(self.provider)
+
+    @property
+    def client(self):
+        return client_pool.openai(api_key=self.api_key)
+
+    async def _complete(self, game_state: GameState) -> str:
+        params = {}
+        response_format = openai_response_format(self.model)
+        if response_format:
+            params["response_format"] = response_format
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[{
+                "role": "system",
+                "content": RULES
+            }, {
+                "role": "user",
+                "content": self._create_prompt(game_state)
+            }],
+            temperature=0.7,
+            max_tokens=MAX_REPLY_TOKENS,
+            seed=self.decision_rng(game_state).randrange(2 ** 31),  # Best-effort determinism for seeded games
+            **params
+        )
+        return response.choices[0].message.content
 
 class ClaudePlayer(AIPlayer):
-    def __init__(self, color: PlayerColor):
-        super().__init__(color, "claude-3.5-sonnet")
-        self.client = AsyncAnthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+    provider = "anthropic"
 
-    async def make_decision(self, game_state: GameState) -> Dict:
-        try:
-            response = await self.client.messages.create(
-                model="claude-3-sonnet-20240229",
-                max_tokens=1024,
-                messages=[{
-                    "role": "user",
-                    "content": self._create_prompt(game_state)
-                }],
-                system="You are an AI playing So Long Sucker. Respond only with a JSON object containing your move."
-            )
-            move = self._extract_json(response.content[0].text)
-            return self._validate_move(move)
-        except Exception as e:
-            print(f"Error during {self.color}'s turn: {e}")
-            return self._format_safe_move()
+    def __init__(self, color: PlayerColor, policy: Optional[RequestPolicy] = None):
+        super().__init__(color, "claude-3.5-sonnet", policy)
+        self.api_key = require_api_key(self.provider)
+
+    @property
+    def client(self):
+        return client_pool.anthropic(api_key=self.api_key)
+
+    async def _complete(self, game_state: GameState) -> str:
+        # The reply is started with "{" and stops at the closing brace, so it can only be the JSON object
+        response = await self.client.messages.create(
+            model="claude-3-sonnet-20240229",
+            max_tokens=MAX_REPLY_TOKENS,
+            messages=[{
+                "role": "user",
+                "content": self._create_prompt(game_state)
+            }, {
+                "role": "assistant",
+                "content": "{"
+            }],
+            system=RULES,
+            stop_sequences=["}"]
+        )
+        return "{" + response.content[0].text + "}"
 
 class LocalPlayer(AIPlayer):
-    def __init__(self, color: PlayerColor, model_name: str):
-        super().__init__(color, model_name)
+    provider = "local"
+
+    def __init__(self, color: PlayerColor, model_name: str, policy: Optional[RequestPolicy] = None):
+        super().__init__(color, model_name, policy)
         self.model_name = model_name
-        self.client = AsyncOpenAI(
-            base_url="http://127.0.0.1:1234/v1",
-            api_key="not-needed"
+
+    @property
+    def client(self):
+        return client_pool.openai(base_url=LOCAL_BASE_URL, api_key="not-needed")
+
+    async def _complete(self, game_state: GameState) -> str:
+        # The rules come first and never change, so the server can reuse its cached prefix
+        prompt = f"""System: {RULES}
+User: {self._create_prompt(game_state)}
+Assistant: {{"""
+
+        params = {"extra_body": {"grammar": MOVE_GRAMMAR}} if LOCAL_GRAMMAR else {}
+        # Concurrent games' prompts for this model go to the server as one batch
+        text = await local_batcher.complete(
+            self.client,
+            self.model_name,
+            prompt,
+            max_tokens=MAX_REPLY_TOKENS,
+            temperature=0.7,
+            stop=["}", "User:", "System:", "Human:"],
+            **params
         )
+        return "{" + text + "}"
+
+class RandomPlayer(AIPlayer):
+    """Plays a uniformly random legal move. A baseline that needs no model endpoint."""
+
+    def __init__(self, color: PlayerColor, seed: Optional[int] = None):
+        super().__init__(color, "random")
+        self.rng = random.Random(seed)
 
     async def make_decision(self, game_state: GameState) -> Dict:
-        try:
-            prompt = f"""System: You are an AI playing So Long Sucker.
-User: {self._create_prompt(game_state)}
-Assistant: Here is my move in JSON format:"""
-
-            response = await self.client.completions.create(
-                model=self.model_name,
-                prompt=prompt,
-                max_tokens=500,
-                temperature=0.7,
-                stop=["User:", "System:", "Human:"]
-            )
-            
-            move = self._extract_json(response.choices[0].text)
-            return self._validate_move(move)
-            
-        except Exception as e:
-            print(f"Error with local model {self.model_name}: {e}")
-            return self._format_safe_move()
\ No newline at end of file
+        legal_moves = game_state.legal_moves(self.color)
+        if not legal_moves:
+            return self._format_safe_move()
+        move = decode_move(self.decision_rng(game_state).choice(legal_moves))
+        move["reasoning"] = "Random legal move"
+        return move
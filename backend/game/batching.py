@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+from typing import Any, Dict, List, Optional, Set, Tuple
+from weakref import WeakKeyDictionary
+
+# Statuses with which a server rejects the list prompt itself rather than failing for the moment
+UNSUPPORTED_STATUS = (400, 422)
+
+class _Batch:
+    def __init__(self, client, model: str, params: Dict):
+        self.client = client
+        self.model = model
+        self.params = params
+        self.prompts: List[str] = []
+        self.futures: List[asyncio.Future] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+class CompletionBatcher:
+    """
+    Coalesces concurrent completion requests for the same model into one call.
+
+    The first prompt for a (client, model, parameters) group opens a window of
+    `window` seconds; every prompt arriving in it goes out with it as a single
+    completions.create(prompt=[...]) and each caller gets the choice with its
+    index back. A batch is sent early once it holds max_batch prompts.
+
+    Servers that reject list prompts, or answer them with the wrong number of
+    choices, are remembered and get the same prompts as at most max_parallel
+    concurrent single requests instead. Other failures of a batched call, such
+    as timeouts or server errors, are passed on to that batch's callers only.
+    """
+
+    def __init__(self, window: float = 0.01, max_batch: int = 16, max_parallel: int = 4):
+        self.window = window
+        self.max_batch = max_batch
+        self.max_parallel = max_parallel
+        self.batches_sent = 0
+        self.prompts_sent = 0
+        self._pending: WeakKeyDictionary = WeakKeyDictionary()  # loop -> {group: _Batch}
+        self._unbatched: Set[Tuple] = set()
+        self._sending: Set[asyncio.Task] = set()  # The loop only keeps weak references to tasks
+
+    async def complete(self, client, model: str, prompt: str, **params) -> str:
+        loop = asyncio.get_running_loop()
+        group = (id(client), model, json.dumps(params, sort_keys=True))
+        pending = self._pending.setdefault(loop, {})
+
+        batch = pending.get(group)
+        if batch is None:
+            batch = pending[group] = _Batch(client, model, params)
+            batch.timer = loop.call_later(self.window, self._flush, pending, group)
+
+        future = loop.create_future()
+        batch.prompts.append(prompt)
+        batch.futures.append(future)
+        if len(batch.prompts) >= self.max_batch:
+            batch.timer.cancel()
+            self._flush(pending, group)
+        return await future
+
+    def _flush(self, pending: Dict[Tuple, _Batch], group: Tuple):
+        batch = pending.pop(group, None)
+        if batch:
+            task = asyncio.create_task(self._send(batch, group))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: _Batch, group: Tuple):
+        self.batches_sent += 1
+        self.prompts_sent += len(batch.prompts)
+        try:
+            if len(batch.prompts) > 1 and group not in self._unbatched:
+                texts = await self._send_batched(batch)
+                if texts is None:
+                    self._unbatched.add(group)
+                    texts = await self._send_parallel(batch)
+            else:
+                texts = await self._send_parallel(batch)
+        except Exception as e:
+            texts = [e] * len(batch.prompts)
+
+        for future, text in zip(batch.futures, texts):
+            if future.done():
+                continue  # The caller gave up (deadline or hedge) while the batch was out
+            if isinstance(text, BaseException):
+                future.set_exception(text)
+            else:
+                future.set_result(text)
+
+    async def _send_batched(self, batch: _Batch) -> Optional[List[str]]:
+        """One request for the whole batch, or None if the server can't batch."""
+        try:
+            response = await batch.client.completions.create(model=batch.model, prompt=batch.prompts,
+                                                             **batch.params)
+        except Exception as e:
+            if getattr(e, "status_code", None) not in UNSUPPORTED_STATUS:
+                raise
+            print(f"Batched completion rejected, falling back to single requests: {e}")
+            return None
+
+        texts: List[Any] = [None] * len(batch.prompts)
+        for choice in response.choices:
+            if 0 <= choice.index < len(texts):
+                texts[choice.index] = choice.text
+        if any(text is None for text in texts):
+            print(f"Batched completion returned {len(response.choices)} choices for {len(texts)} prompts, "
+                  f"falling back to single requests")
+            return None
+        return texts
+
+    async def _send_parallel(self, batch: _Batch) -> List[Any]:
+        semaphore = asyncio.Semaphore(self.max_parallel)
+
+        async def send(prompt: str) -> str:
+            async with semaphore:
+                response = await batch.client.completions.create(model=batch.model, prompt=prompt,
+                                                                 **batch.params)
+                return response.choices[0].text
+
+        return await asyncio.gather(*(send(prompt) for prompt in batch.prompts), return_exceptions=True)
+
+    def stats(self) -> Dict:
+        return {
+            "batches": self.batches_sent,
+            "prompts": self.prompts_sent,
+            "meanBatchSize": self.prompts_sent / self.batches_sent if self.batches_sent else 0.0
+        }
+
+local_batcher = CompletionBatcher(window=float(os.getenv("LOCAL_BATCH_WINDOW_MS", "10")) / 1000,
+                                  max_batch=int(os.getenv("LOCAL_MAX_BATCH", "16")))
@@ -0,0 +1,168 @@
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from itertools import permutations
+from typing import Dict, Optional, Tuple
+from .models import Board, Move, TRANSFER, NUM_COLORS
+
+def fingerprint(board: Board, player: int) -> Tuple[str, Tuple[int, ...]]:
+    """
+    Canonical key for the position as `player` sees it: their own chips, every
+    player's hand size, the piles as color sequences and the defeated players,
+    i.e. everything game.prompts shows the model.
+
+    Colors are relabelled so the player is always 0 and the other three get
+    whichever labels give the smallest key, so positions that differ only by
+    a permutation of colors share a key. Returns the key and the relabelling
+    used (relabel[color] -> canonical color).
+    """
+    others = [color for color in range(NUM_COLORS) if color != player]
+    hand = board.hands[player]
+    hand_sizes = [board.hand_size(p) for p in range(NUM_COLORS)]
+    best_key = None
+    best_relabel = None
+    for labels in permutations(range(1, NUM_COLORS)):
+        relabel = [0] * NUM_COLORS
+        for color, label in zip(others, labels):
+            relabel[color] = label
+
+        counts = [0] * NUM_COLORS
+        sizes = [0] * NUM_COLORS
+        for color in range(NUM_COLORS):
+            counts[relabel[color]] = hand[color]
+            sizes[relabel[color]] = hand_sizes[color]
+        piles = ".".join("".join(str(relabel[chip]) for chip in pile.chips) for pile in board.piles)
+        defeated = "".join(sorted(str(relabel[p]) for p in board.defeated))
+        key = f"{''.join(map(str, counts))}|{'.'.join(map(str, sizes))}|{piles}|{defeated}"
+
+        if best_key is None or key < best_key:
+            best_key, best_relabel = key, tuple(relabel)
+    return best_key, best_relabel
+
+def relabel_move(move: Move, relabel: Tuple[int, ...]) -> Move:
+    action, chip, target = move
+    return action, relabel[chip], relabel[target] if action == TRANSFER else target
+
+def restore_move(move: Move, relabel: Tuple[int, ...]) -> Move:
+    """Undo relabel_move."""
+    inverse = [0] * NUM_COLORS
+    for color, label in enumerate(relabel):
+        inverse[label] = color
+    return relabel_move(move, tuple(inverse))
+
+_STOP = object()
+
+class DecisionCache:
+    """
+    LRU cache of model decisions keyed by model and canonical position, with
+    optional expiry after `ttl` seconds and an optional SQLite file behind it
+    that survives restarts and can be shared between tournament workers.
+
+    put() only queues the disk write; a background thread commits queued
+    decisions in batches, so a game loop never waits on disk. Call close() to
+    write what is queued.
+
+    Share one instance between players by setting their `cache` attribute.
+    """
+
+    def __init__(self, max_entries: int = 100_000, ttl: Optional[float] = None, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()  # key -> (stored at, move)
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None  # Reads, on the caller's thread
+        self._queue: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        if path:
+            self._db = sqlite3.connect(path, timeout=30)
+            self._db.execute("CREATE TABLE IF NOT EXISTS decisions "
+                             "(key TEXT PRIMARY KEY, action INTEGER, chip INTEGER, target INTEGER, stored REAL)")
+            self._db.commit()
+
+    def _expired(self, stored: float) -> bool:
+        return self.ttl is not None and time.time() - stored > self.ttl
+
+    def get(self, key: str) -> Optional[Move]:
+        entry = self._entries.get(key)
+        if entry is None and self._db:
+            row = self._db.execute("SELECT stored, action, chip, target FROM decisions WHERE key = ?",
+                                   (key,)).fetchone()
+            if row:
+                entry = (row[0], tuple(row[1:]))
+                self._remember(key, entry)
+
+        if entry is None or self._expired(entry[0]):
+            if entry is not None:
+                self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, move: Move):
+        entry = (time.time(), tuple(move))
+        self._remember(key, entry)
+        if self._db:
+            self._start()
+            self._queue.put((key, *entry[1], entry[0]))
+
+    def _start(self):
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, name="decision-cache", daemon=True)
+                self._writer.start()
+
+    def _run(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            while True:
+                # Everything queued while the last batch was being written goes in one transaction
+                batch = [self._queue.get()]
+                while batch[-1] is not _STOP:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                rows = [row for row in batch if row is not _STOP]
+                if rows:
+                    try:
+                        with db:
+                            db.executemany("INSERT OR REPLACE INTO decisions VALUES (?, ?, ?, ?, ?)", rows)
+                    except sqlite3.Error as e:
+                        print(f"Failed to store {len(rows)} cached decisions: {e}")
+                if batch[-1] is _STOP:
+                    return
+        finally:
+            db.close()
+
+    def _remember(self, key: str, entry: Tuple[float, Move]):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries)
+        }
+
+    def close(self):
+        """Write what is queued and close the file."""
+        if self._writer is not None:
+            self._queue.put(_STOP)
+            self._writer.join()
+            self._writer = None
+        if self._db:
+            self._db.close()
+            self._db = None
@@ -1,183 +1,335 @@
 import random
-from typing import Optional, List, Set
-from .models import PlayerColor, Chip, GameState
-from .ai_players import GPTPlayer, ClaudePlayer, LocalPlayer
+import time
+from typing import Optional, Dict, List, TYPE_CHECKING
+from . import metrics
+from .models import (
+    PlayerColor, GameState, Board, Pile, Move, SeatStats, PLAY,
+    COLORS, COLOR_INDEX, FULL_MASK, MAX_PILES, NUM_COLORS, encode_move
+)
+from .ai_players import AIPlayer
+
+if TYPE_CHECKING:
+    from .replay import ReplayWriter
+
+MAX_SEED = 2 ** 53  # Drawn seeds stay below this so JSON clients (JavaScript numbers) hold them exactly
+
+def default_players() -> Dict[PlayerColor, AIPlayer]:
+    """The standard AI Battle lineup: two cloud models and two local models (see game.lineup)."""
+    from .lineup import Lineup, DEFAULT_LINEUP
+    return Lineup(DEFAULT_LINEUP).players()
 
 class GameEngine:
-    def __init__(self):
+    def __init__(self, players: Optional[Dict[PlayerColor, AIPlayer]] = None, seed: Optional[int] = None):
+        # Everything random in a game follows from its seed: the first player here,
+        # and the choices of built-in players through GameState.seed
+        self.seed = seed if seed is not None else random.randrange(MAX_SEED)
+        rng = random.Random(self.seed)
         self.state = GameState(
-            players={
-                PlayerColor.RED: GPTPlayer(PlayerColor.RED),
-                PlayerColor.BLUE: ClaudePlayer(PlayerColor.BLUE),
-                PlayerColor.GREEN: LocalPlayer(PlayerColor.GREEN, "llama-3.2-3b-instruct"),
-                PlayerColor.YELLOW: LocalPlayer(PlayerColor.YELLOW, "qwen2-0.5b-instruct")
-            },
-            playing_area=[],
-            defeated_players=[],
-            current_turn=random.choice(list(PlayerColor)),  # Random first player
-            piles=[]
+            players=players if players is not None else default_players(),
+            board=Board(current=rng.randrange(NUM_COLORS), handoff=rng.getrandbits(64)),  # Random first player
+            seed=self.seed
         )
-        self.removed_chips: Set[Chip] = set()  # Track chips removed from game
+        self.history: List[tuple] = []  # Undo records for moves made with apply()
+        self._redo: List[Optional[Move]] = []
+        self.last_move: Optional[Move] = None  # Move executed by the last play_turn()
+        self.recorder: Optional['ReplayWriter'] = None  # Receives every turn played by play_turn()
+        self.responses: Optional[Dict[int, Dict]] = None  # Recorded turns to replay, by ply (see game.replay)
+        self.seat_stats = [SeatStats() for _ in range(NUM_COLORS)]  # Per seat, by color index
+        self._next_chosen = False  # Whether the last executed move picked the next player itself
         self.initialize_game()
 
     def initialize_game(self):
         """Give each player their initial 7 chips."""
-        for player in self.state.players.values():
-            player.chips = [Chip(player.color, player.color) for _ in range(7)]
+        self.state.board = Board(current=self.state.board.current, handoff=self.state.board.handoff)
 
-    def _check_captures(self, pile_index: int) -> Optional[PlayerColor]:
+    def _check_captures(self, pile_index: int) -> Optional[int]:
         """Check for captures in a pile and handle them. Returns the next player to move."""
-        pile = self.state.piles[pile_index]
-        if len(pile) < 2:
+        board = self.state.board
+        pile = board.piles[pile_index]
+        chips = pile.chips
+        if len(chips) < 2 or chips[-1] != chips[-2]:
             return None
 
-        # Check top two chips
-        top_two = pile[-2:]
-        if top_two[0].color == top_two[1].color:
-            capturing_color = top_two[0].color
-            
-            # Remove one chip from game
-            self.removed_chips.add(pile.pop())
-            
-            # Captured chips go to the capturing player
-            captured_chips = pile.pop()  # Remove second chip
-            
-            # If capturing player is defeated, the capture rebounds
-            if capturing_color in self.state.defeated_players:
-                return self.state.current_turn
-            
-            # Give captured chips to capturing player
-            capturing_player = self.state.players[capturing_color]
-            capturing_player.chips.append(captured_chips)
-            
-            return capturing_color  # Capturing player gets next move
-            
-        return None
+        capturing_color = chips[-1]
+
+        # Remove one chip from game
+        board.removed[pile.pop()] += 1
+
+        # Captured chips go to the capturing player
+        captured_chip = pile.pop()  # Remove second chip
+
+        # If capturing player is defeated, the capture rebounds and the chip leaves the game
+        if board.is_defeated(capturing_color):
+            board.removed[captured_chip] += 1
+            return board.current
 
-    def _check_all_colors_in_pile(self, pile: List[Chip]) -> Optional[PlayerColor]:
+        # Give captured chips to capturing player
+        board.hands[capturing_color][captured_chip] += 1
+
+        return capturing_color  # Capturing player gets next move
+
+    def _check_all_colors_in_pile(self, pile: Pile) -> Optional[int]:
         """Check if all colors are in pile and return deepest player if so."""
-        colors_in_pile = {chip.color for chip in pile}
-        if len(colors_in_pile) == 4:
-            # Find the first chip from bottom that belongs to a non-defeated player
-            for chip in pile:
-                if chip.color not in self.state.defeated_players:
-                    return chip.color
+        if pile.mask != FULL_MASK:
+            return None
+        # Find the first chip from bottom that belongs to a non-defeated player
+        defeated_mask = self.state.board.defeated_mask
+        for color in pile.chips:
+            if not defeated_mask >> color & 1:
+                return color
         return None
 
-    def _get_missing_colors(self, pile: List[Chip]) -> Set[PlayerColor]:
-        """Get colors not present in the pile."""
-        colors_in_pile = {chip.color for chip in pile}
-        return set(PlayerColor) - colors_in_pile
+    def _get_missing_colors(self, pile: Pile) -> int:
+        """Get colors not present in the pile, as a bitmask."""
+        return ~pile.mask & FULL_MASK
 
-    def _can_player_move(self, player: 'AIPlayer') -> bool:
+    def _can_player_move(self, player: int) -> bool:
         """Check if a player has any legal moves available."""
-        return len(player.chips) > 0
+        return any(self.state.board.hands[player])
+
+    def legal_moves(self, color: Optional[PlayerColor] = None) -> List[Move]:
+        """Every play and transfer available to a player (default: the current one)."""
+        board = self.state.board
+        return board.legal_moves(board.current if color is None else COLOR_INDEX[color])
 
     def execute_move(self, move: dict) -> bool:
         """Execute a player's move and handle all consequences."""
-        current_player = self.state.players[self.state.current_turn]
-        
-        if current_player.defeated:
-            return False
-            
+        start = time.perf_counter()
         try:
-            if move["action"] == "play":
-                # Find the chip to play
-                chip_color = PlayerColor(move["chip"])
-                chip = next((c for c in current_player.chips if c.color == chip_color), None)
-                
-                if not chip:
-                    return False
-                    
-                # Get or create target pile
-                target_pile = int(move["target"])
-                while len(self.state.piles) <= target_pile:
-                    self.state.piles.append([])
-                
-                # Play the chip
-                self.state.piles[target_pile].append(chip)
-                current_player.chips.remove(chip)
-                
-                # Check for captures
-                next_player = self._check_captures(target_pile)
-                if next_player:
-                    self.state.current_turn = next_player
-                    return True
-                
+            return self._execute(encode_move(move))
+        except Exception as e:
+            print(f"Error executing move: {e}")
+            return False
+        finally:
+            metrics.execute_latency.observe(time.perf_counter() - start)
+
+    def _execute(self, move: Move) -> bool:
+        """Execute a compact move. Returns False, leaving the board untouched, if it is illegal."""
+        board = self.state.board
+        current = board.current
+        action, chip, target = move
+        self._next_chosen = False
+
+        if board.is_defeated(current):
+            return False
+
+        hand = board.hands[current]
+        if not hand[chip]:
+            return False
+
+        if action == PLAY:
+            # Players may start at most one new pile, and only up to MAX_PILES
+            if not 0 <= target <= len(board.piles) or target >= MAX_PILES:
+                return False
+
+            # Get or create target pile
+            if len(board.piles) <= target:
+                board.piles.append(Pile())
+
+            # Play the chip
+            pile = board.piles[target]
+            pile.push(chip)
+            hand[chip] -= 1
+
+            # Check for captures
+            next_player = self._check_captures(target)
+            if next_player is None:
                 # Check for all colors
-                pile = self.state.piles[target_pile]
                 next_player = self._check_all_colors_in_pile(pile)
-                if next_player:
-                    self.state.current_turn = next_player
-                    return True
-                
-                # Get missing colors and valid next players
-                missing_colors = self._get_missing_colors(pile)
-                valid_next_players = [
-                    color for color in missing_colors 
-                    if color not in self.state.defeated_players
-                ]
-                
-                if valid_next_players:
-                    # Current player chooses next player from valid options
-                    # For AI, we'll just pick the first valid option
-                    self.state.current_turn = valid_next_players[0]
+            if next_player is not None:
+                board.current = next_player
+                self._next_chosen = True
+                return True
+
+            # Current player chooses next player from the missing colors that are still in the game.
+            # For AI, the game's handoff generator picks one at random
+            valid_next_players = self._get_missing_colors(pile) & ~board.defeated_mask
+            if valid_next_players:
+                board.current = board.pick_handoff(valid_next_players)
+                self._next_chosen = True
+            # Otherwise there is no valid next player and the turn passes on as usual
+
+        else:
+            if target == current or not 0 <= target < NUM_COLORS:
+                return False
+
+            board.hands[target][chip] += 1
+            hand[chip] -= 1
+
+        return True
+
+    def apply(self, move: Optional[Move]) -> bool:
+        """
+        Play a compact move and advance the turn, recording it in the move log.
+
+        Pass None when the current player has nothing to play; the turn still
+        advances, defeating them. Returns False and records nothing if the move
+        is illegal. Moves made with execute_move are not logged, so don't mix
+        the two on an engine whose log you intend to undo.
+        """
+        if not self._apply(move):
+            return False
+        self._redo.clear()
+        return True
+
+    def _apply(self, move: Optional[Move]) -> bool:
+        board = self.state.board
+        entry = (move, board.current, len(board.defeated), len(board.piles),
+                 board.removed[move[1]] if move else 0, board.handoff)
+        if move is not None and not self._execute(move):
+            return False
+        self.update_turn()
+        self.history.append(entry)
+        return True
+
+    def undo(self) -> Optional[Move]:
+        """Take back the last applied move. Returns it, or None if the log is empty."""
+        if not self.history:
+            return None
+
+        move, current, defeated, num_piles, removed, handoff = self.history.pop()
+        board = self.state.board
+
+        if len(board.defeated) != defeated:
+            del board.defeated[defeated:]
+            board.defeated_mask = 0
+            for player in board.defeated:
+                board.defeated_mask |= 1 << player
+
+        if move is not None:
+            action, chip, target = move
+            if action == PLAY:
+                pile = board.piles[target]
+                # A capture took the played chip and the matching one beneath it off the pile
+                captured = board.removed[chip] - removed
+                if captured:
+                    board.removed[chip] = removed
+                    if captured == 1:
+                        board.hands[chip][chip] -= 1
+                    pile.push(chip)
                 else:
-                    # No valid next player, continue with current player
-                    pass
-                    
-            elif move["action"] == "transfer":
-                chip_color = PlayerColor(move["chip"])
-                target_player = PlayerColor(move["target"])
-                
-                chip = next((c for c in current_player.chips if c.color == chip_color), None)
-                if not chip or target_player == current_player.color:
-                    return False
-                    
-                self.state.players[target_player].chips.append(chip)
-                current_player.chips.remove(chip)
-            
-            return True
-            
-        except Exception as e:
-            print(f"Error executing move: {e}")
+                    pile.pop()
+                del board.piles[num_piles:]
+            else:
+                board.hands[target][chip] -= 1
+            board.hands[current][chip] += 1
+
+        board.current = current
+        board.handoff = handoff
+        self._redo.append(move)
+        return move
+
+    def redo(self) -> bool:
+        """Re-apply the most recently undone move. Returns False if there is nothing to redo."""
+        if not self._redo:
             return False
+        return self._apply(self._redo.pop())
+
+    def clone(self) -> 'GameEngine':
+        """Copy the game data, sharing the players, into an engine with an empty move log."""
+        return GameEngine.from_state(self.state)
+
+    @classmethod
+    def from_state(cls, state: GameState) -> 'GameEngine':
+        """Build an engine around a copy of an existing game's board, e.g. for lookahead."""
+        return cls.from_board(state.board.copy(), state.players)
+
+    @classmethod
+    def from_board(cls, board: Board, players: Optional[Dict[PlayerColor, AIPlayer]] = None) -> 'GameEngine':
+        """Build an engine that plays on the given board without creating any players."""
+        engine = cls.__new__(cls)
+        engine.state = GameState(players=players if players is not None else {}, board=board)
+        engine.history = []
+        engine._redo = []
+        engine.last_move = None
+        engine.recorder = None
+        engine.responses = None
+        engine.seed = None
+        engine.seat_stats = [SeatStats() for _ in range(NUM_COLORS)]
+        engine._next_chosen = False
+        return engine
+
+    async def play_turn(self) -> bool:
+        """Ask the current player for a move, apply it and advance the turn.
+
+        Returns True if the player's move was executed.
+        """
+        player = self.state.board.current
+        current_player = self.state.players[COLORS[player]]
+        executed = False
+        move = None
+        latency = 0.0
+        self.last_move = None
+
+        # A seat with nothing to play passes without being asked; update_turn() then defeats it
+        if self.state.board.legal_moves(player):
+            start = time.perf_counter()
+            try:
+                if self.responses is not None:
+                    move = await current_player.replay_decision(self.responses.get(self.state.ply), self.state)
+                else:
+                    move = await current_player.decide(self.state)
+                latency = time.perf_counter() - start
+                executed = self.execute_move(move)
+                if executed:
+                    self.last_move = encode_move(move)
+                else:
+                    metrics.illegal_moves.inc(model=current_player.model_type)
+            except Exception as e:
+                print(f"Error during {current_player.color}'s turn: {e}")
+            metrics.moves.inc(model=current_player.model_type)
+            metrics.moves_per_second.mark()
+            stats = self.seat_stats[player]
+            stats.turns += 1
+            stats.illegal += not executed
+            stats.decision_time += latency
+
+        self.update_turn()
+        self.state.ply += 1
+        if self._check_game_over():
+            metrics.games.inc()
+            metrics.games_per_hour.mark()
+        if self.recorder:
+            self.recorder.record_turn(player, move, latency, executed, self.state.board)
+        return executed
 
     def update_turn(self):
-        """Update turn and check for defeated players."""
+        """
+        Update turn and check for defeated players. The turn passes to the next
+        player in order unless the move just executed chose who moves next.
+        """
+        board = self.state.board
+        next_chosen, self._next_chosen = self._next_chosen, False
         # Check if current player is defeated
-        current_player = self.state.players[self.state.current_turn]
-        if not self._can_player_move(current_player):
-            if self.current_turn not in self.state.defeated_players:
-                self.state.defeated_players.append(self.current_turn)
-                current_player.defeated = True
-            
+        if not self._can_player_move(board.current):
+            board.defeat(board.current)
+
             # Move returns to player who gave them the move
             # For now, we'll just move to the next non-defeated player
             self._move_to_next_player()
             return
 
-        if not self._check_game_over():
+        if not next_chosen and not self._check_game_over():
             self._move_to_next_player()
 
     def _move_to_next_player(self):
         """Move to the next non-defeated player."""
-        current_idx = list(PlayerColor).index(self.state.current_turn)
-        next_idx = (current_idx + 1) % 4
-        
-        while next_idx != current_idx:
-            next_color = list(PlayerColor)[next_idx]
-            if next_color not in self.state.defeated_players:
-                self.state.current_turn = next_color
+        board = self.state.board
+        next_idx = (board.current + 1) % NUM_COLORS
+
+        while next_idx != board.current:
+            if not board.defeated_mask >> next_idx & 1:
+                board.current = next_idx
                 return
-            next_idx = (next_idx + 1) % 4
+            next_idx = (next_idx + 1) % NUM_COLORS
 
     def _check_game_over(self) -> bool:
         """Check if the game is over."""
-        active_players = [p for p in self.state.players.values() if not p.defeated]
-        return len(active_players) <= 1
+        return len(self.state.board.defeated) >= NUM_COLORS - 1
 
     def get_winner(self) -> Optional[PlayerColor]:
         """Get the winning player, if any."""
-        active_players = [p for p in self.state.players.values() if not p.defeated]
-        return active_players[0].color if len(active_players) == 1 else None
\ No newline at end of file
+        active_players = FULL_MASK & ~self.state.board.defeated_mask
+        if len(self.state.board.defeated) != NUM_COLORS - 1:
+            return None
+        return COLORS[active_players.bit_length() - 1]
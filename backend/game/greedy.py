@@ -0,0 +1,52 @@
+import random
+from typing import Dict, Optional
+from .ai_players import AIPlayer
+from .engine import GameEngine
+from .models import PlayerColor, GameState, Board, COLOR_INDEX, NUM_COLORS, decode_move
+
+class GreedyPlayer(AIPlayer):
+    """
+    One-ply lookahead player that needs no model endpoint.
+
+    Tries every legal move on a copy of the board and keeps the one leaving it
+    best placed: winning outright, then most chips in hand relative to the
+    strongest opponent. Having the move costs a chip, so positions where it
+    would move again are marked down. Ties are broken at random.
+    """
+
+    def __init__(self, color: PlayerColor, seed: Optional[int] = None):
+        super().__init__(color, "greedy")
+        self.rng = random.Random(seed)
+
+    async def make_decision(self, game_state: GameState) -> Dict:
+        legal_moves = game_state.legal_moves(self.color)
+        if not legal_moves:
+            return self._format_safe_move()
+
+        me = COLOR_INDEX[self.color]
+        engine = GameEngine.from_board(game_state.board.copy())
+        best_score, best_moves = None, []
+        for move in legal_moves:
+            engine.apply(move)
+            score = self._score(engine, me)
+            engine.undo()
+            if best_score is None or score > best_score:
+                best_score, best_moves = score, [move]
+            elif score == best_score:
+                best_moves.append(move)
+
+        move = decode_move(self.decision_rng(game_state).choice(best_moves))
+        move["reasoning"] = f"Greedy: best of {len(legal_moves)} moves scores {best_score:.1f}"
+        return move
+
+    def _score(self, engine: GameEngine, me: int) -> float:
+        board: Board = engine.state.board
+        winner = engine.get_winner()
+        if winner is not None:
+            return 100.0 if COLOR_INDEX[winner] == me else -100.0
+        if board.is_defeated(me):
+            return -100.0
+
+        strongest = max((board.hand_size(p) for p in range(NUM_COLORS) if p != me and not board.is_defeated(p)),
+                        default=0)
+        return board.hand_size(me) - strongest - (1.5 if board.current == me else 0.0)
@@ -0,0 +1,114 @@
+"""
+Player registry and lineup specs.
+
+A lineup spec names a player type for each seat, with an optional argument
+after a colon:
+
+    "red=gpt,blue=claude,green=local:llama-3.2-3b-instruct,yellow=mcts:500"
+    "random,greedy,mcts:200,random"      seats in color order
+    "greedy"                             the same type in every seat
+    {"red": "mcts:500", "blue": "random", ...}   as sent with start_game
+
+Built-in types: gpt and local (argument: model name), claude, random, greedy and
+mcts (argument: simulations per move). register_player() adds more.
+"""
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+from .ai_players import AIPlayer, GPTPlayer, ClaudePlayer, LocalPlayer, RandomPlayer
+from .greedy import GreedyPlayer
+from .mcts import MCTSPlayer
+from .models import PlayerColor, COLORS
+
+PlayerFactory = Callable[[PlayerColor, Optional[str]], AIPlayer]
+LineupSpec = Union[str, Dict[str, str]]
+
+PLAYER_TYPES: Dict[str, PlayerFactory] = {}
+ARG_CHECKS: Dict[str, Callable[[str], Any]] = {}
+
+DEFAULT_LINEUP = "red=gpt,blue=claude,green=local:llama-3.2-3b-instruct,yellow=local:qwen2-0.5b-instruct"
+
+def register_player(name: str, factory: PlayerFactory, check_arg: Optional[Callable[[str], Any]] = None):
+    """
+    Make a player type available to lineup specs. The factory gets the seat
+    color and the argument, if any. check_arg, if given, is called with the
+    argument when a lineup is parsed and raises ValueError if it is unusable.
+    """
+    PLAYER_TYPES[name] = factory
+    if check_arg:
+        ARG_CHECKS[name] = check_arg
+
+def _simulations(arg: str) -> int:
+    simulations = int(arg)
+    if simulations < 1:
+        raise ValueError("must be at least 1")
+    return simulations
+
+register_player("gpt", lambda color, arg: GPTPlayer(color, model=arg or "gpt-4"))
+register_player("claude", lambda color, arg: ClaudePlayer(color))
+register_player("local", lambda color, arg: LocalPlayer(color, arg or "llama-3.2-3b-instruct"))
+register_player("random", lambda color, arg: RandomPlayer(color))
+register_player("greedy", lambda color, arg: GreedyPlayer(color))
+register_player("mcts", lambda color, arg: MCTSPlayer(color, simulations=_simulations(arg) if arg else 1000),
+                check_arg=_simulations)
+
+def parse_lineup(spec: LineupSpec) -> Dict[PlayerColor, Tuple[str, Optional[str]]]:
+    """Seat -> (player type, argument). Raises ValueError for unknown types or incomplete lineups."""
+    if isinstance(spec, dict):
+        seats = {PlayerColor(color): str(entry) for color, entry in spec.items()}
+    else:
+        entries = [entry.strip() for entry in spec.split(",") if entry.strip()]
+        if all("=" in entry for entry in entries):
+            seats = {PlayerColor(color.strip()): entry.strip()
+                     for color, entry in (entry.split("=", 1) for entry in entries)}
+        elif len(entries) == 1:
+            seats = {color: entries[0] for color in COLORS}
+        elif len(entries) == len(COLORS):
+            seats = dict(zip(COLORS, entries))
+        else:
+            raise ValueError(f"Lineup {spec!r} must name one player type or one per seat")
+
+    missing = [color.value for color in COLORS if color not in seats]
+    if missing:
+        raise ValueError(f"Lineup {spec!r} has no player for {', '.join(missing)}")
+
+    lineup = {}
+    for color in COLORS:
+        kind, _, arg = seats[color].partition(":")
+        if kind not in PLAYER_TYPES:
+            raise ValueError(f"Unknown player type {kind!r}; choose from {', '.join(sorted(PLAYER_TYPES))}")
+        if arg and kind in ARG_CHECKS:
+            try:
+                ARG_CHECKS[kind](arg)
+            except ValueError as e:
+                raise ValueError(f"Bad argument {arg!r} for {kind} on {color.value}: {e}") from None
+        lineup[color] = (kind, arg or None)
+    return lineup
+
+def is_lineup_spec(spec: str) -> bool:
+    """Whether a string is a lineup spec rather than something else, such as a 'module:callable' path."""
+    try:
+        parse_lineup(spec)
+        return True
+    except ValueError:
+        return False
+
+class Lineup:
+    """
+    A parsed lineup that builds its players once and hands the same instances
+    to every game. Players keep no per-game state, so one Lineup can serve any
+    number of games, including concurrent ones.
+    """
+
+    def __init__(self, spec: LineupSpec = DEFAULT_LINEUP):
+        self.seats = parse_lineup(spec)
+        self._players: Optional[Dict[PlayerColor, AIPlayer]] = None
+
+    @property
+    def key(self) -> str:
+        """Canonical spec string, equal for equivalent specs."""
+        return ",".join(f"{color.value}={kind}{':' + arg if arg else ''}"
+                        for color, (kind, arg) in self.seats.items())
+
+    def players(self) -> Dict[PlayerColor, AIPlayer]:
+        if self._players is None:
+            self._players = {color: PLAYER_TYPES[kind](color, arg) for color, (kind, arg) in self.seats.items()}
+        return dict(self._players)
@@ -0,0 +1,142 @@
+import asyncio
+import math
+import random
+import time
+from typing import Dict, List, Optional
+from .ai_players import AIPlayer
+from .engine import GameEngine
+from .models import PlayerColor, GameState, Board, Move, COLOR_INDEX, NUM_COLORS, decode_move
+
+def _legal_moves(board: Board) -> List[Optional[Move]]:
+    """The current player's moves, or [None] if they have nothing to play and must pass."""
+    return board.legal_moves(board.current) or [None]
+
+class _Node:
+    __slots__ = ("move", "mover", "parent", "children", "untried", "visits", "rewards")
+
+    def __init__(self, move: Optional[Move], mover: int, parent: Optional['_Node'],
+                 untried: List[Optional[Move]]):
+        self.move = move
+        self.mover = mover  # Player who made the move leading here
+        self.parent = parent
+        self.children: List[_Node] = []
+        self.untried = untried
+        self.visits = 0
+        self.rewards = [0.0] * NUM_COLORS
+
+class MCTSPlayer(AIPlayer):
+    """
+    Monte Carlo Tree Search player that needs no model endpoint.
+
+    Runs max^n UCT over a private copy of the board: each node is scored from the
+    point of view of the player who moved into it. Searches for `simulations`
+    iterations, or until `time_limit` seconds pass if one is given; with a time
+    limit the search depends on machine speed, so seeded games no longer replay
+    exactly.
+    """
+
+    def __init__(self, color: PlayerColor, simulations: int = 1000, time_limit: Optional[float] = None,
+                 exploration: float = 1.4, rollout_depth: int = 60, seed: Optional[int] = 0):
+        super().__init__(color, "mcts")
+        self.simulations = simulations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.rollout_depth = rollout_depth
+        self.rng = random.Random(seed)
+
+    async def make_decision(self, game_state: GameState) -> Dict:
+        try:
+            engine = GameEngine.from_state(game_state)
+            # The search is CPU-bound; run it on a thread so other games and spectators keep going
+            root = await asyncio.to_thread(self._search, engine, self.decision_rng(game_state))
+            if not root.children:
+                return self._format_safe_move()
+
+            best = max(root.children, key=lambda child: child.visits)
+            if best.move is None:  # Nothing to play
+                return self._format_safe_move()
+            move = decode_move(best.move)
+            move["reasoning"] = (f"MCTS: {best.visits}/{root.visits} visits, "
+                                 f"value {best.rewards[best.mover] / best.visits:.2f}")
+            return move
+        except Exception as e:
+            print(f"Error during {self.color}'s turn: {e}")
+            return self._format_safe_move()
+
+    def _search(self, engine: GameEngine, rng: random.Random) -> _Node:
+        board = engine.state.board
+        root = _Node(None, board.current, None, _legal_moves(board))
+        deadline = time.perf_counter() + self.time_limit if self.time_limit else None
+
+        for i in range(self.simulations):
+            if deadline and i % 16 == 0 and time.perf_counter() > deadline:
+                break
+
+            node = root
+            depth = 0
+
+            # Selection
+            while not node.untried and node.children:
+                node = self._select_child(node)
+                engine.apply(node.move)
+                depth += 1
+
+            # Expansion
+            if node.untried and not engine._check_game_over():
+                move = node.untried.pop(rng.randrange(len(node.untried)))
+                mover = board.current
+                engine.apply(move)
+                depth += 1
+                child = _Node(move, mover, node, _legal_moves(board))
+                node.children.append(child)
+                node = child
+
+            # Rollout
+            depth += self._rollout(engine, rng)
+            rewards = self._rewards(engine)
+
+            # Backpropagation
+            while node is not None:
+                node.visits += 1
+                for player in range(NUM_COLORS):
+                    node.rewards[player] += rewards[player]
+                node = node.parent
+
+            for _ in range(depth):
+                engine.undo()
+
+        return root
+
+    def _select_child(self, node: _Node) -> _Node:
+        log_visits = math.log(node.visits)
+        exploration = self.exploration
+        return max(
+            node.children,
+            key=lambda child: child.rewards[child.mover] / child.visits
+            + exploration * math.sqrt(log_visits / child.visits)
+        )
+
+    def _rollout(self, engine: GameEngine, rng: random.Random) -> int:
+        """Play random moves until the game ends or the depth cap. Returns the number of moves applied."""
+        board = engine.state.board
+        for depth in range(self.rollout_depth):
+            if engine._check_game_over():
+                return depth
+            moves = _legal_moves(board)
+            engine.apply(moves[rng.randrange(len(moves))])
+        return self.rollout_depth
+
+    def _rewards(self, engine: GameEngine) -> List[float]:
+        """1 for the winner; for unfinished games, the surviving players' share of chips in hand."""
+        board = engine.state.board
+        winner = engine.get_winner()
+        if winner is not None:
+            rewards = [0.0] * NUM_COLORS
+            rewards[COLOR_INDEX[winner]] = 1.0
+            return rewards
+
+        sizes = [0 if board.is_defeated(p) else board.hand_size(p) for p in range(NUM_COLORS)]
+        total = sum(sizes)
+        if not total:
+            return [0.0] * NUM_COLORS
+        return [size / total for size in sizes]
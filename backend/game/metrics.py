@@ -0,0 +1,187 @@
+"""
+In-process metrics in the Prometheus text format, without extra dependencies.
+
+Metrics are module-level objects that the engine, players and server update
+directly; main.py serves registry.render() on /metrics. Setting PROFILE_DIR
+also runs game loops under cProfile (see profiled()).
+"""
+import cProfile
+import os
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+PROFILE_DIR = os.getenv("PROFILE_DIR")
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+FAST_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1)
+
+def _label_text(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return "\n".join([f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self.samples())
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_label_text(self.labels, key)} {value}" for key, value in self.values.items()]
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        self.series: Dict[Tuple, List] = {}  # key -> [per-bucket counts (+Inf last), sum]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {cumulative}")
+        return lines
+
+class Rate(Metric):
+    """Events per `per` seconds over the last `window` seconds, as a gauge."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, per: float = 1.0, window: float = 60.0):
+        super().__init__(name, help)
+        self.per = per
+        self.window = window
+        self._seconds: Deque[List] = deque()  # [whole second, events in it]
+        self._started = time.monotonic()
+
+    def mark(self, count: int = 1):
+        second = int(time.monotonic())
+        if self._seconds and self._seconds[-1][0] == second:
+            self._seconds[-1][1] += count
+        else:
+            self._seconds.append([second, count])
+
+    def value(self) -> float:
+        now = time.monotonic()
+        while self._seconds and self._seconds[0][0] < now - self.window:
+            self._seconds.popleft()
+        span = min(self.window, max(now - self._started, 1.0))
+        return sum(count for _, count in self._seconds) * self.per / span
+
+    def samples(self) -> List[str]:
+        return [f"{self.name} {self.value()}"]
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+registry = Registry()
+
+provider_latency = registry.register(Histogram(
+    "sls_provider_request_seconds", "Model provider request latency", ("provider", "model")))
+provider_errors = registry.register(Counter(
+    "sls_provider_errors_total", "Model requests that raised instead of returning a reply", ("provider", "model")))
+parse_failures = registry.register(Counter(
+    "sls_parse_failures_total", "Model replies with no parseable JSON move", ("model",)))
+validations = registry.register(Counter(
+    "sls_move_validations_total",
+    "Validated model moves by result: ok, corrected (mapped to the nearest legal move), invalid or error",
+    ("model", "result")))
+execute_latency = registry.register(Histogram(
+    "sls_execute_move_seconds", "Time spent in GameEngine.execute_move", buckets=FAST_BUCKETS))
+illegal_moves = registry.register(Counter(
+    "sls_illegal_moves_total", "Moves rejected by GameEngine.execute_move", ("model",)))
+moves = registry.register(Counter("sls_moves_total", "Turns played", ("model",)))
+moves_per_second = registry.register(Rate("sls_moves_per_second", "Turns played per second, last minute"))
+games = registry.register(Counter("sls_games_finished_total", "Games played to the end"))
+games_per_hour = registry.register(Rate("sls_games_per_hour", "Games finished per hour, last 10 minutes",
+                                        per=3600.0, window=600.0))
+broadcast_latency = registry.register(Histogram(
+    "sls_broadcast_seconds", "Time to build and queue one turn's update for all spectators", buckets=FAST_BUCKETS))
+
+_profiler: Optional[cProfile.Profile] = None
+_profiled_loops = 0
+
+@contextmanager
+def profiled(name: str, directory: Optional[str] = None):
+    """
+    Run the block under cProfile if PROFILE_DIR (or directory) is set.
+
+    Only one profiler can run per thread, so concurrent game loops share it: it
+    starts with the first loop and is written to <directory>/<name>.prof when
+    the last one ends, covering every game that was running meanwhile.
+    """
+    global _profiler, _profiled_loops
+    directory = directory or PROFILE_DIR
+    if not directory:
+        yield
+        return
+
+    if _profiler is None:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    _profiled_loops += 1
+    try:
+        yield
+    finally:
+        _profiled_loops -= 1
+        if _profiled_loops == 0:
+            _profiler.disable()
+            os.makedirs(directory, exist_ok=True)
+            _profiler.dump_stats(os.path.join(directory, f"{name}.prof"))
+            _profiler = None
@@ -1,7 +1,8 @@
 from __future__ import annotations  # This enables forward references
-from dataclasses import dataclass
+from array import array
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import List, Dict, TYPE_CHECKING
+from typing import List, Dict, Optional, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from .ai_players import AIPlayer
@@ -12,28 +13,226 @@ class PlayerColor(Enum):
     GREEN = "green"
     YELLOW = "yellow"
 
+# Colors are stored as small ints (their index here) in the compact board
+COLORS: Tuple[PlayerColor, ...] = tuple(PlayerColor)
+COLOR_INDEX: Dict[PlayerColor, int] = {color: i for i, color in enumerate(COLORS)}
+NUM_COLORS = len(COLORS)
+FULL_MASK = (1 << NUM_COLORS) - 1
+CHIPS_PER_PLAYER = 7
+MAX_PILES = 10  # Players address piles 0-9
+
+# 64-bit linear congruential generator that picks the next player when a play leaves a choice
+HANDOFF_MULTIPLIER = 6364136223846793005
+HANDOFF_INCREMENT = 1442695040888963407
+HANDOFF_MASK = (1 << 64) - 1
+
+# Moves in compact form: (action, chip color index, target pile or player index)
+PLAY, TRANSFER = 0, 1
+ACTIONS = ("play", "transfer")
+Move = Tuple[int, int, int]
+
+def encode_move(move: Dict) -> Move:
+    """Convert a move dict as produced by the players into compact form."""
+    action = ACTIONS.index(move["action"])
+    chip = COLOR_INDEX[PlayerColor(move["chip"])]
+    if action == PLAY:
+        target = int(move["target"])
+    else:
+        target = COLOR_INDEX[PlayerColor(move["target"])]
+    return action, chip, target
+
+def decode_move(move: Move) -> Dict:
+    """Convert a compact move back into the dict format used by the players."""
+    action, chip, target = move
+    return {
+        "action": ACTIONS[action],
+        "chip": COLORS[chip].value,
+        "target": str(target) if action == PLAY else COLORS[target].value
+    }
+
 @dataclass
 class Chip:
     color: PlayerColor
     owner: PlayerColor
 
+class Pile:
+    """A pile of chips stored bottom first as color indexes, with a color bitmask kept up to date."""
+    __slots__ = ("chips", "counts", "mask")
+
+    def __init__(self, chips=()):
+        self.chips = array("b", chips)
+        self.counts = [0] * NUM_COLORS
+        for color in self.chips:
+            self.counts[color] += 1
+        self.mask = 0
+        for color, count in enumerate(self.counts):
+            if count:
+                self.mask |= 1 << color
+
+    def push(self, color: int):
+        self.chips.append(color)
+        self.counts[color] += 1
+        self.mask |= 1 << color
+
+    def pop(self) -> int:
+        color = self.chips.pop()
+        self.counts[color] -= 1
+        if not self.counts[color]:
+            self.mask &= ~(1 << color)
+        return color
+
+    def copy(self) -> Pile:
+        pile = Pile.__new__(Pile)
+        pile.chips = array("b", self.chips)
+        pile.counts = self.counts[:]
+        pile.mask = self.mask
+        return pile
+
+    def __len__(self) -> int:
+        return len(self.chips)
+
+class Board:
+    """
+    Compact game data: everything about a game except the players themselves.
+
+    hands[player][color] is the number of chips of that color a player holds,
+    removed[color] counts chips taken out of the game, and defeated keeps the
+    defeated players in order with defeated_mask mirroring it as a bitmask.
+    handoff is the state of the generator that picks who moves next when a
+    play leaves several players to choose from; it travels with the board so
+    copies, undo and replays make the same picks.
+    Copying a board is cheap, so it doubles as a snapshot for simulation.
+    """
+    __slots__ = ("hands", "piles", "removed", "defeated", "defeated_mask", "current", "handoff")
+
+    def __init__(self, current: int, handoff: int = 0):
+        self.hands = [[0] * NUM_COLORS for _ in range(NUM_COLORS)]
+        for player in range(NUM_COLORS):
+            self.hands[player][player] = CHIPS_PER_PLAYER
+        self.piles: List[Pile] = []
+        self.removed = [0] * NUM_COLORS
+        self.defeated: List[int] = []
+        self.defeated_mask = 0
+        self.current = current
+        self.handoff = handoff
+
+    def copy(self) -> Board:
+        board = Board.__new__(Board)
+        board.hands = [hand[:] for hand in self.hands]
+        board.piles = [pile.copy() for pile in self.piles]
+        board.removed = self.removed[:]
+        board.defeated = self.defeated[:]
+        board.defeated_mask = self.defeated_mask
+        board.current = self.current
+        board.handoff = self.handoff
+        return board
+
+    def to_data(self) -> List:
+        """Plain lists, e.g. for JSON: [hands, piles, removed, defeated, current, handoff]."""
+        return [self.hands, [list(pile.chips) for pile in self.piles], self.removed, self.defeated, self.current,
+                self.handoff]
+
+    @classmethod
+    def from_data(cls, data: List) -> Board:
+        hands, piles, removed, defeated, current, *handoff = data  # Records before handoff have 5 fields
+        board = cls.__new__(cls)
+        board.hands = [list(hand) for hand in hands]
+        board.piles = [Pile(chips) for chips in piles]
+        board.removed = list(removed)
+        board.defeated = list(defeated)
+        board.defeated_mask = 0
+        for player in board.defeated:
+            board.defeated_mask |= 1 << player
+        board.current = current
+        board.handoff = handoff[0] if handoff else 0
+        return board
+
+    def hand_size(self, player: int) -> int:
+        return sum(self.hands[player])
+
+    def is_defeated(self, player: int) -> bool:
+        return bool(self.defeated_mask >> player & 1)
+
+    def defeat(self, player: int):
+        if not self.is_defeated(player):
+            self.defeated.append(player)
+            self.defeated_mask |= 1 << player
+
+    def pick_handoff(self, candidates: int) -> int:
+        """Pick one player from a nonempty bitmask, drawing from the handoff generator if there is a choice."""
+        if not candidates & (candidates - 1):
+            return candidates.bit_length() - 1
+        self.handoff = (self.handoff * HANDOFF_MULTIPLIER + HANDOFF_INCREMENT) & HANDOFF_MASK
+        players = [player for player in range(NUM_COLORS) if candidates >> player & 1]
+        return players[(self.handoff >> 33) % len(players)]
+
+    def legal_moves(self, player: int) -> List[Move]:
+        """Every move the engine would accept from a player on their turn."""
+        if self.is_defeated(player):
+            return []
+        hand = self.hands[player]
+        pile_targets = range(min(len(self.piles) + 1, MAX_PILES))
+        player_targets = [p for p in range(NUM_COLORS) if p != player]
+        moves = []
+        for chip in range(NUM_COLORS):
+            if hand[chip]:
+                moves.extend((PLAY, chip, target) for target in pile_targets)
+                moves.extend((TRANSFER, chip, target) for target in player_targets)
+        return moves
+
+@dataclass
+class SeatStats:
+    """What one seat did over a game: turns taken, moves the engine rejected and time spent deciding."""
+    turns: int = 0
+    illegal: int = 0
+    decision_time: float = 0.0
+
 @dataclass
 class GameState:
     players: Dict[PlayerColor, AIPlayer]
-    playing_area: List[Chip]
-    defeated_players: List[PlayerColor]
-    current_turn: PlayerColor
-    piles: List[List[Chip]]
-    
+    board: Board
+    playing_area: List[Chip] = field(default_factory=list)
+    seed: Optional[int] = None  # The game's seed; built-in players derive their choices from it
+    ply: int = 0  # Turns played so far
+
+    @property
+    def current_turn(self) -> PlayerColor:
+        return COLORS[self.board.current]
+
+    @current_turn.setter
+    def current_turn(self, color: PlayerColor):
+        self.board.current = COLOR_INDEX[color]
+
+    @property
+    def defeated_players(self) -> List[PlayerColor]:
+        return [COLORS[p] for p in self.board.defeated]
+
+    @property
+    def piles(self) -> List[List[Chip]]:
+        return [[Chip(COLORS[c], COLORS[c]) for c in pile.chips] for pile in self.board.piles]
+
+    def chips(self, color: PlayerColor) -> List[Chip]:
+        """The chips held by a player, grouped by color."""
+        return [Chip(COLORS[c], COLORS[c])
+                for c, count in enumerate(self.board.hands[COLOR_INDEX[color]])
+                for _ in range(count)]
+
+    def is_defeated(self, color: PlayerColor) -> bool:
+        return self.board.is_defeated(COLOR_INDEX[color])
+
+    def legal_moves(self, color: PlayerColor) -> List[Move]:
+        return self.board.legal_moves(COLOR_INDEX[color])
+
     def to_dict(self):
         return {
             "players": {color.value: {
                 "color": color.value,
-                "chips": [{"color": c.color.value, "owner": c.owner.value} for c in player.chips],
+                "chips": [{"color": c.color.value, "owner": c.owner.value} for c in self.chips(color)],
                 "modelType": player.model_type,
-                "defeated": player.defeated
+                "defeated": self.is_defeated(color)
             } for color, player in self.players.items()},
-            "piles": [[{"color": c.color.value, "owner": c.owner.value} for c in pile] for pile in self.piles],
+            "piles": [[{"color": COLORS[c].value, "owner": COLORS[c].value} for c in pile.chips]
+                      for pile in self.board.piles],
             "currentTurn": self.current_turn.value,
             "defeatedPlayers": [p.value for p in self.defeated_players]
-        }
\ No newline at end of file
+        }
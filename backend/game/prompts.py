@@ -0,0 +1,113 @@
+"""
+Prompt encoding for model players.
+
+Every prompt starts with RULES, the same text for every turn, seat and game,
+so providers and local servers can reuse their cached prefix; only the short
+state block from encode_state() changes. The state uses one letter per chip:
+
+    you:G
+    hand:GGGGGRR
+    hands:R7 B5 G7 Y3
+    piles:0:RBG 1:YY 2:_
+    out:-
+    legal:play R,G on 0-3 (3 is new) | give R,G to R,B,Y
+
+Models answer with a short JSON move ({"act":"play","chip":"G","to":"2"}),
+which MOVE_SCHEMA and MOVE_GRAMMAR describe for providers that can constrain
+their output. expand_move() turns it back into the move dict the players use.
+"""
+from typing import Dict, Optional
+from .models import GameState, PlayerColor, PLAY, TRANSFER, COLORS, COLOR_INDEX
+
+LETTERS = "".join(color.value[0].upper() for color in COLORS)  # "RBGY"
+LETTER_COLORS: Dict[str, PlayerColor] = {letter: color for letter, color in zip(LETTERS, COLORS)}
+
+RULES = f"""You are playing So Long Sucker. Players {', '.join(f'{letter}={color.value}' for letter, color in LETTER_COLORS.items())}, 7 chips each.
+On your turn, play a chip you hold onto a pile or give it to another player. You may play any chip you hold.
+Two chips of the same color on top of a pile are captured: one leaves the game, the other goes to that color's player, who moves next.
+When a pile holds all four colors, the player whose chip is deepest moves next.
+A player with no chips on their turn is defeated; the last player left wins.
+
+State: one letter per chip; piles list chips bottom to top, _ for an empty pile; out lists defeated players.
+Answer with one JSON object and nothing else:
+{{"act":"play","chip":"<letter>","to":"<pile number>"}} or {{"act":"give","chip":"<letter>","to":"<player letter>"}}"""
+
+# A reply is about 15 tokens; the cap leaves room for a code fence but not for an essay
+MAX_REPLY_TOKENS = 32
+
+MOVE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "act": {"type": "string", "enum": ["play", "give"]},
+        "chip": {"type": "string", "enum": list(LETTERS)},
+        "to": {"type": "string", "enum": [str(pile) for pile in range(10)] + list(LETTERS)}
+    },
+    "required": ["act", "chip", "to"],
+    "additionalProperties": False
+}
+
+# GBNF for llama.cpp-style servers, continuing a reply that was started with "{"
+MOVE_GRAMMAR = (r'root ::= "\"act\":\"play\",\"chip\":" letter ",\"to\":\"" [0-9] "\""'
+                r' | "\"act\":\"give\",\"chip\":" letter ",\"to\":" letter' "\n"
+                r'letter ::= "\"" [' + LETTERS + r'] "\""')
+
+# OpenAI models that accept response_format={"type": "json_schema"}
+JSON_SCHEMA_MODELS = ("gpt-4o", "gpt-4.1")
+
+def _letters(counts) -> str:
+    return "".join(LETTERS[color] * count for color, count in enumerate(counts))
+
+def describe_legal_moves(game_state: GameState, color: PlayerColor) -> str:
+    """The legal moves in compact form: any chip listed can go to any target listed."""
+    moves = game_state.legal_moves(color)
+    if not moves:
+        return "none"
+
+    chips = ",".join(LETTERS[c] for c in sorted({move[1] for move in moves}))
+    last_pile = max(move[2] for move in moves if move[0] == PLAY)
+    new_pile = len(game_state.board.piles)
+    players = ",".join(LETTERS[p] for p in sorted({move[2] for move in moves if move[0] == TRANSFER}))
+
+    description = f"play {chips} on 0-{last_pile}" if last_pile else f"play {chips} on 0"
+    if new_pile <= last_pile:
+        description += f" ({new_pile} is new)"
+    return description + f" | give {chips} to {players}"
+
+def encode_state(game_state: GameState, color: PlayerColor) -> str:
+    """The per-turn part of a prompt: the position as seen by `color`."""
+    board = game_state.board
+    piles = " ".join(f"{index}:{''.join(LETTERS[c] for c in pile.chips) or '_'}"
+                     for index, pile in enumerate(board.piles))
+    return "\n".join([
+        f"you:{LETTERS[COLOR_INDEX[color]]}",
+        f"hand:{_letters(board.hands[COLOR_INDEX[color]]) or '-'}",
+        f"hands:{' '.join(f'{LETTERS[p]}{sum(hand)}' for p, hand in enumerate(board.hands))}",
+        f"piles:{piles or '-'}",
+        f"out:{','.join(LETTERS[p] for p in board.defeated) or '-'}",
+        f"legal:{describe_legal_moves(game_state, color)}"
+    ])
+
+def _color_name(value) -> str:
+    text = str(value).strip()
+    color = LETTER_COLORS.get(text.upper())
+    return color.value if color else text.lower()
+
+def expand_move(reply: Dict) -> Dict:
+    """
+    A compact reply as a player move dict. Replies already in the long form
+    (action/chip/target with color names), such as older recorded ones, pass through.
+    """
+    if not isinstance(reply, dict) or "act" not in reply:
+        return reply
+    action = str(reply["act"]).strip().lower()
+    return {
+        "action": "transfer" if action in ("give", "transfer") else action,
+        "chip": _color_name(reply.get("chip", "")),
+        "target": _color_name(reply.get("to", ""))
+    }
+
+def openai_response_format(model: str) -> Optional[Dict]:
+    """Structured output for OpenAI models that support JSON schemas, None for the rest."""
+    if not model.startswith(JSON_SCHEMA_MODELS):
+        return None
+    return {"type": "json_schema", "json_schema": {"name": "move", "strict": True, "schema": MOVE_SCHEMA}}
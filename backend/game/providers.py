@@ -0,0 +1,150 @@
+import asyncio
+import os
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+# OpenAI-compatible server for local models (LM Studio by default)
+LOCAL_BASE_URL = os.getenv("LOCAL_BASE_URL", "http://127.0.0.1:1234/v1")
+
+# Send the move grammar (game.prompts.MOVE_GRAMMAR) with local completions; needs a llama.cpp-style server
+LOCAL_GRAMMAR = os.getenv("LOCAL_GRAMMAR", "").lower() in ("1", "true", "yes")
+
+# Environment variable holding each cloud provider's API key
+API_KEY_VARS = {"openai": "OPENAI_API_KEY", "anthropic": "ANTHROPIC_API_KEY"}
+
+def require_api_key(provider: str) -> str:
+    """The provider's API key from the environment; raises EnvironmentError if it isn't set."""
+    var = API_KEY_VARS[provider]
+    key = os.getenv(var)
+    if not key:
+        raise EnvironmentError(f"Missing {var}, needed for {provider} players. "
+                               "Set it in the environment or a .env file.")
+    return key
+
+class ProviderLimits:
+    """
+    Caps on in-flight model requests per provider, shared by every game in the process.
+
+    Providers without a limit are only counted. Semaphores are kept per event loop
+    so the same limits work for servers and for tournament workers that start a
+    fresh loop per batch.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        self.limits: Dict[str, int] = dict(limits or {})
+        self.in_flight: Counter = Counter()
+        self._semaphores: WeakKeyDictionary = WeakKeyDictionary()
+
+    def set_limit(self, provider: str, limit: Optional[int]):
+        """Set (or with None, remove) a provider's cap. Applies to requests started afterwards."""
+        if limit is None:
+            self.limits.pop(provider, None)
+        else:
+            self.limits[provider] = limit
+        self._semaphores.clear()
+
+    def _semaphore(self, provider: str) -> Optional[asyncio.Semaphore]:
+        limit = self.limits.get(provider)
+        if limit is None:
+            return None
+        semaphores = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        if provider not in semaphores:
+            semaphores[provider] = asyncio.Semaphore(limit)
+        return semaphores[provider]
+
+    @asynccontextmanager
+    async def slot(self, provider: Optional[str]):
+        """Hold one request slot for the provider; a no-op for players without a provider."""
+        if provider is None:
+            yield
+            return
+
+        semaphore = self._semaphore(provider)
+        if semaphore:
+            await semaphore.acquire()
+        self.in_flight[provider] += 1
+        try:
+            yield
+        finally:
+            self.in_flight[provider] -= 1
+            if semaphore:
+                semaphore.release()
+
+# Local prompts are coalesced by game.batching, so many can wait on one server request
+provider_limits = ProviderLimits({"openai": 32, "anthropic": 32, "local": 64})
+
+class ClientPool:
+    """
+    Model API clients shared by every player and game in the process.
+
+    Players borrow a client per request instead of owning one, so starting a
+    game opens no connections and TLS sessions are reused across games. The
+    provider SDKs are imported with their first client, so a process that only
+    runs local or built-in players never loads them. There
+    is one client per (provider, base_url, api_key) and event loop, each over a
+    keep-alive connection pool capped at max_connections. Configure the caps
+    before the first request; clients already created keep their settings.
+    """
+
+    def __init__(self, max_connections: int = 100, max_keepalive: int = 20, keepalive_expiry: float = 30.0,
+                 limits: ProviderLimits = provider_limits):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.limits = limits
+        self._clients: WeakKeyDictionary = WeakKeyDictionary()
+
+    def configure(self, max_connections: Optional[int] = None, max_keepalive: Optional[int] = None,
+                  keepalive_expiry: Optional[float] = None):
+        if max_connections is not None:
+            self.max_connections = max_connections
+        if max_keepalive is not None:
+            self.max_keepalive = max_keepalive
+        if keepalive_expiry is not None:
+            self.keepalive_expiry = keepalive_expiry
+
+    def _loop_clients(self) -> Dict[Tuple, Any]:
+        return self._clients.setdefault(asyncio.get_running_loop(), {})
+
+    def _http_client(self, factory):
+        import httpx
+        return factory(limits=httpx.Limits(max_connections=self.max_connections,
+                                           max_keepalive_connections=self.max_keepalive,
+                                           keepalive_expiry=self.keepalive_expiry))
+
+    def openai(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        """An AsyncOpenAI client; also used for OpenAI-compatible local servers via base_url."""
+        import openai
+        clients = self._loop_clients()
+        key = ("openai", base_url, api_key)
+        if key not in clients:
+            clients[key] = openai.AsyncOpenAI(api_key=api_key, base_url=base_url,
+                                              http_client=self._http_client(openai.DefaultAsyncHttpxClient))
+        return clients[key]
+
+    def anthropic(self, api_key: Optional[str] = None):
+        import anthropic
+        clients = self._loop_clients()
+        key = ("anthropic", None, api_key)
+        if key not in clients:
+            clients[key] = anthropic.AsyncAnthropic(api_key=api_key,
+                                                    http_client=self._http_client(anthropic.DefaultAsyncHttpxClient))
+        return clients[key]
+
+    async def aclose(self):
+        """Close the clients created on the running loop."""
+        clients = self._clients.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.close()
+
+    def stats(self) -> Dict:
+        return {
+            "clients": sum(len(clients) for clients in self._clients.values()),
+            "inFlight": {provider: count for provider, count in self.limits.in_flight.items() if count},
+            "maxConnections": self.max_connections
+        }
+
+client_pool = ClientPool(max_connections=int(os.getenv("MODEL_MAX_CONNECTIONS", "100")),
+                         max_keepalive=int(os.getenv("MODEL_MAX_KEEPALIVE", "20")))
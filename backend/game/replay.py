@@ -0,0 +1,156 @@
+"""
+Game records: an append-only JSON Lines file per game.
+
+Each line is one compact record, tagged by "t":
+    {"t":"h","v":2,"seed":...,"lineup":{"red":"gpt-4",...},"board":[...]}   header, initial board
+    {"t":"m","n":0,"p":2,"raw":"...","move":[0,1,3],"ms":812.4,"ok":true}   one turn
+    {"t":"k","n":31,"board":[...]}                                          board after turn n
+    {"t":"e","n":57,"winner":"red"}                                         end of game
+
+"move" is the validated move in compact (action, chip, target) form, or null
+if the player produced nothing usable; "ok" says whether the engine accepted
+it. A keyframe is written every keyframe_interval turns, so a reader can
+rebuild the board after any turn from the nearest keyframe before it.
+"""
+import json
+from bisect import bisect_right
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+from .engine import GameEngine
+from .models import Board, GameState, Move, encode_move
+
+FORMAT_VERSION = 2  # 2: boards carry the handoff generator state
+
+def _dumps(record: Dict) -> str:
+    return json.dumps(record, separators=(",", ":")) + "\n"
+
+class ReplayWriter:
+    """Streams one game's record to a file as it is played. Attach it as GameEngine.recorder."""
+
+    def __init__(self, path: str, keyframe_interval: int = 32):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.turns = 0
+        self._file: IO[str] = open(path, "w", encoding="utf-8")
+
+    def start(self, state: GameState, seed: Optional[int] = None):
+        """Write the header; seed defaults to the game's own (GameState.seed)."""
+        lineup = {color.value: player.model_type for color, player in state.players.items()}
+        seed = seed if seed is not None else state.seed
+        self._file.write(_dumps({"t": "h", "v": FORMAT_VERSION, "seed": seed, "lineup": lineup,
+                                 "board": state.board.to_data()}))
+
+    def record_turn(self, player: int, decision: Optional[Dict], latency: float, ok: bool, board: Board):
+        """Record one play_turn(); board is the state after the turn."""
+        try:
+            move = list(encode_move(decision)) if decision else None
+        except (KeyError, ValueError):
+            move = None
+        self._file.write(_dumps({
+            "t": "m",
+            "n": self.turns,
+            "p": player,
+            "raw": decision.get("raw") if decision else None,
+            "move": move,
+            "ms": round(latency * 1000, 1),
+            "ok": ok
+        }))
+        if (self.turns + 1) % self.keyframe_interval == 0:
+            self._file.write(_dumps({"t": "k", "n": self.turns, "board": board.to_data()}))
+            self._file.flush()
+        self.turns += 1
+
+    def finish(self, winner=None):
+        self._file.write(_dumps({"t": "e", "n": self.turns, "winner": winner.value if winner else None}))
+        self.close()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+class ReplayReader:
+    """
+    Random access to a game record.
+
+    Opening the file scans it once for keyframe offsets without parsing the
+    turns; board_after(n) then parses only the turns since the nearest keyframe.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.turns = 0
+        self.end: Optional[Dict] = None
+        self._keyframes: List[Tuple[int, int]] = []  # (turn, offset of the keyframe line)
+
+        with open(path, "rb") as f:
+            self.header = json.loads(f.readline())
+            self._start = offset = f.tell()
+            for line in f:
+                if line.startswith(b'{"t":"m"'):
+                    self.turns += 1
+                elif line.startswith(b'{"t":"k"'):
+                    self._keyframes.append((json.loads(line)["n"], offset))
+                elif line.startswith(b'{"t":"e"'):
+                    self.end = json.loads(line)
+                offset += len(line)
+        self._keyframe_turns = [turn for turn, _ in self._keyframes]
+
+    @property
+    def seed(self) -> Optional[int]:
+        return self.header["seed"]
+
+    @property
+    def lineup(self) -> Dict[str, str]:
+        return self.header["lineup"]
+
+    @property
+    def winner(self) -> Optional[str]:
+        return self.end["winner"] if self.end else None
+
+    def initial_board(self) -> Board:
+        return Board.from_data(self.header["board"])
+
+    def _records(self, offset: int) -> Iterator[Dict]:
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                yield json.loads(line)
+
+    def moves(self, start: int = 0) -> Iterator[Dict]:
+        """Turn records from turn `start` on."""
+        for record in self._records(self._seek_offset(start - 1)[1]):
+            if record["t"] == "m" and record["n"] >= start:
+                yield record
+
+    def responses(self) -> Dict[int, Dict]:
+        """Every turn record by turn number, for replaying the players' decisions (GameEngine.responses)."""
+        return {record["n"]: record for record in self.moves()}
+
+    def _seek_offset(self, turn: int) -> Tuple[Optional[int], int]:
+        """The last keyframe at or before `turn`: (its turn, its file offset), or (None, first turn offset)."""
+        index = bisect_right(self._keyframe_turns, turn) - 1
+        if index < 0:
+            return None, self._start
+        return self._keyframes[index]
+
+    def board_after(self, turn: int) -> Board:
+        """The board after turn `turn` (-1 for the initial board)."""
+        if not -1 <= turn < self.turns:
+            raise IndexError(f"Turn {turn} out of range for a {self.turns}-turn game")
+
+        keyframe_turn, offset = self._seek_offset(turn)
+        records = self._records(offset)
+        if keyframe_turn is None:
+            board = self.initial_board()
+            keyframe_turn = -1
+        else:
+            board = Board.from_data(next(records)["board"])
+
+        engine = GameEngine.from_board(board)
+        for record in records:
+            if record["t"] != "m" or record["n"] <= keyframe_turn:
+                continue
+            if record["n"] > turn:
+                break
+            move: Optional[Move] = tuple(record["move"]) if record["ok"] else None
+            engine.apply(move)
+        return engine.state.board
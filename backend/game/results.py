@@ -0,0 +1,259 @@
+"""
+Persistent game results and leaderboards.
+
+ResultStore keeps every finished game, with per-seat move stats, in SQLite.
+record() only puts the game on a queue; a background thread writes queued
+games in batches, one transaction each, so a game loop never waits on disk.
+The same transaction updates the leaderboard tables, so queries read a few
+aggregate rows instead of scanning the results:
+
+    ratings      Elo rating, games, wins and move stats per model
+    seat_stats   games and wins per seat
+
+Ratings treat a four-player game as six head-to-head results: the winner
+beats each other seat and the losers draw among themselves, with K divided
+by the three opponents. Games without a winner count towards games played
+but leave ratings alone. Several processes may share one file.
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, TYPE_CHECKING
+from .models import COLORS, COLOR_INDEX, NUM_COLORS
+
+if TYPE_CHECKING:
+    from .engine import GameEngine
+
+INITIAL_RATING = 1500.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, source TEXT, seed INTEGER, winner TEXT,
+    moves INTEGER, duration REAL, finished_at REAL);
+CREATE TABLE IF NOT EXISTS game_seats (
+    game_id INTEGER, seat TEXT, model TEXT, won INTEGER,
+    turns INTEGER, illegal INTEGER, decision_time REAL);
+CREATE TABLE IF NOT EXISTS ratings (
+    model TEXT PRIMARY KEY, rating REAL, games INTEGER, wins INTEGER,
+    turns INTEGER, illegal INTEGER, decision_time REAL);
+CREATE TABLE IF NOT EXISTS seat_stats (
+    seat TEXT PRIMARY KEY, games INTEGER, wins INTEGER);
+"""
+
+@dataclass
+class SeatResult:
+    seat: str
+    model: str
+    turns: int = 0
+    illegal: int = 0
+    decision_time: float = 0.0
+
+@dataclass
+class StoredGame:
+    source: str  # What played the game, e.g. "server" or "tournament"
+    winner: Optional[str]
+    moves: int
+    duration: float
+    seats: List[SeatResult]
+    seed: Optional[int] = None
+    finished_at: float = field(default_factory=time.time)
+
+def game_result(engine: 'GameEngine', source: str, duration: float) -> StoredGame:
+    """A StoredGame for a game played on `engine`, with its per-seat stats."""
+    seats = []
+    for color, player in engine.state.players.items():
+        stats = engine.seat_stats[COLOR_INDEX[color]]
+        seats.append(SeatResult(color.value, player.model_type, stats.turns, stats.illegal, stats.decision_time))
+    winner = engine.get_winner()
+    return StoredGame(source, winner.value if winner else None, engine.state.ply, duration, seats, engine.seed)
+
+def elo_changes(ratings: Dict[str, float], seats: List[SeatResult], winner: Optional[str],
+                k_factor: float) -> Dict[str, float]:
+    """Rating change per model for one finished game."""
+    changes = {seat.model: 0.0 for seat in seats}
+    k = k_factor / (NUM_COLORS - 1)
+    for i, a in enumerate(seats):
+        for b in seats[i + 1:]:
+            if a.model == b.model:
+                continue  # A model playing itself learns nothing about its strength
+            expected = 1 / (1 + 10 ** ((ratings[b.model] - ratings[a.model]) / 400))
+            score = 1.0 if a.seat == winner else 0.0 if b.seat == winner else 0.5
+            changes[a.model] += k * (score - expected)
+            changes[b.model] -= k * (score - expected)
+    return changes
+
+_STOP = object()
+
+class ResultStore:
+    """
+    SQLite result store with a background writer (see the module docstring).
+
+    Nothing is opened until the first record() or query, so creating a store
+    has no side effects. Call flush() to wait for queued games to be written
+    and close() to stop the writer.
+    """
+
+    def __init__(self, path: str, batch_size: int = 200, flush_interval: float = 1.0, k_factor: float = 32.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.k_factor = k_factor
+        self.written = 0
+        self.failed = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")  # Readers don't block the writer
+        db.executescript(SCHEMA)
+        return db
+
+    def _start(self):
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, name="result-store", daemon=True)
+                self._writer.start()
+
+    def record(self, game: StoredGame):
+        """Queue a game for writing. Never blocks."""
+        self._start()
+        self._queue.put(game)
+
+    def flush(self):
+        """Block until every game recorded so far is written."""
+        if self._writer is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        """Write what is queued and stop the writer."""
+        if self._writer is None:
+            return
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._writer = None
+
+    def _run(self):
+        try:
+            db = self._connect()
+        except sqlite3.Error as e:
+            print(f"Can't open result store {self.path}: {e}")
+            db = None
+        try:
+            while True:
+                batch = [self._queue.get()]
+                deadline = time.monotonic() + self.flush_interval
+                # Gather more games for the same transaction until the batch is full,
+                # the interval passes, or someone waits for the writes
+                while len(batch) < self.batch_size and isinstance(batch[-1], StoredGame):
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=timeout))
+                    except queue.Empty:
+                        break
+
+                games = [item for item in batch if isinstance(item, StoredGame)]
+                if games and db is None:
+                    self.failed += len(games)
+                elif games:
+                    try:
+                        self._write(db, games)
+                        self.written += len(games)
+                    except sqlite3.Error as e:
+                        print(f"Failed to store {len(games)} game results: {e}")
+                        self.failed += len(games)
+                for item in batch:
+                    if isinstance(item, threading.Event):
+                        item.set()
+                if batch[-1] is _STOP:
+                    return
+        finally:
+            if db:
+                db.close()
+
+    def _write(self, db: sqlite3.Connection, games: List[StoredGame]):
+        db.execute("BEGIN IMMEDIATE")  # Other processes sharing the file wait for this batch
+        try:
+            for game in games:
+                game_id = db.execute(
+                    "INSERT INTO games (source, seed, winner, moves, duration, finished_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (game.source, game.seed, game.winner, game.moves, game.duration, game.finished_at)).lastrowid
+                db.executemany("INSERT INTO game_seats VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               [(game_id, seat.seat, seat.model, seat.seat == game.winner,
+                                 seat.turns, seat.illegal, seat.decision_time) for seat in game.seats])
+                self._update_leaderboard(db, game)
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def _update_leaderboard(self, db: sqlite3.Connection, game: StoredGame):
+        models = sorted({seat.model for seat in game.seats})
+        ratings = {model: INITIAL_RATING for model in models}
+        ratings.update(db.execute(f"SELECT model, rating FROM ratings WHERE model IN ({','.join('?' * len(models))})",
+                                  models).fetchall())
+        changes = elo_changes(ratings, game.seats, game.winner, self.k_factor) if game.winner else {}
+
+        for seat in game.seats:
+            won = seat.seat == game.winner
+            db.execute("INSERT INTO ratings VALUES (?, ?, 1, ?, ?, ?, ?) ON CONFLICT (model) DO UPDATE SET "
+                       "games = games + 1, wins = wins + excluded.wins, turns = turns + excluded.turns, "
+                       "illegal = illegal + excluded.illegal, decision_time = decision_time + excluded.decision_time",
+                       (seat.model, ratings[seat.model], won, seat.turns, seat.illegal, seat.decision_time))
+            db.execute("INSERT INTO seat_stats VALUES (?, 1, ?) ON CONFLICT (seat) DO UPDATE SET "
+                       "games = games + 1, wins = wins + excluded.wins", (seat.seat, won))
+        for model, change in changes.items():
+            db.execute("UPDATE ratings SET rating = ? WHERE model = ?", (ratings[model] + change, model))
+
+    def leaderboard(self, limit: int = 100) -> Dict:
+        """Models by rating and win rates per seat, as stored so far (games still queued are not included)."""
+        db = self._connect()
+        try:
+            models = db.execute("SELECT model, rating, games, wins, turns, illegal, decision_time FROM ratings "
+                                "ORDER BY rating DESC LIMIT ?", (limit,)).fetchall()
+            seats = {seat: (played, wins) for seat, played, wins in db.execute("SELECT * FROM seat_stats")}
+            games, finished = db.execute("SELECT COUNT(*), COUNT(winner) FROM games").fetchone()
+        finally:
+            db.close()
+
+        return {
+            "games": games,
+            "finished": finished,
+            "models": [{
+                "model": model,
+                "rating": round(rating, 1),
+                "games": played,
+                "wins": wins,
+                "winRate": wins / played if played else 0.0,
+                "illegalRate": illegal / turns if turns else 0.0,
+                "meanDecisionMs": decision_time / turns * 1000 if turns else 0.0
+            } for model, rating, played, wins, turns, illegal, decision_time in models],
+            "seats": {seat: {
+                "games": played,
+                "wins": wins,
+                "winRate": wins / played if played else 0.0
+            } for seat, (played, wins) in ((color.value, seats.get(color.value, (0, 0))) for color in COLORS)}
+        }
+
+    def stats(self) -> Dict:
+        return {"queued": self._queue.qsize(), "written": self.written, "failed": self.failed}
+
+def format_leaderboard(board: Dict) -> str:
+    """A leaderboard() as text."""
+    lines = [f"Leaderboard ({board['games']} games, {board['finished']} finished):"]
+    lines += [f"  {entry['model']:<28} {entry['rating']:7.1f}  {entry['winRate']:6.1%} of {entry['games']} seats"
+              for entry in board["models"]]
+    return "\n".join(lines)
+
+# The server's store; RESULTS_DB="" turns storing results off
+_results_db = os.getenv("RESULTS_DB", "results.db")
+result_store: Optional[ResultStore] = ResultStore(_results_db) if _results_db else None
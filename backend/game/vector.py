@@ -0,0 +1,276 @@
+"""
+Batched game simulation with NumPy: K games stored as arrays, advanced in lockstep.
+
+VectorGames applies one move per game per step with whole-batch array ops,
+following the same rules as GameEngine.apply() (execute the move, then
+update_turn), so random or policy rollouts for search players and statistics
+run at array speed instead of one Python call per move. tools.bench_vector
+checks it move by move against the scalar engine.
+
+NumPy is optional for the rest of the backend and only needed here.
+"""
+from typing import Optional, Sequence, Tuple
+from .models import (
+    Board, Move, PLAY, TRANSFER, NUM_COLORS, CHIPS_PER_PLAYER, MAX_PILES, HANDOFF_MULTIPLIER, HANDOFF_INCREMENT
+)
+
+try:
+    import numpy as np
+except ImportError:  # The scalar engine works without NumPy
+    np = None
+
+PILE_CAPACITY = NUM_COLORS * CHIPS_PER_PLAYER  # Every chip in one pile
+PASS = -1  # chip value for "no move": the player has nothing to play
+
+class VectorGames:
+    """
+    K games as arrays, all indexed by game first:
+
+        hands[k, player, color]   chips held
+        hand_sizes[k, player]     total chips held
+        piles[k, pile, depth]     chip colors bottom first, -1 above the top
+        heights[k, pile]          chips in each pile
+        pile_counts[k, pile, c]   chips of each color in each pile
+        num_piles[k]              piles in play, like len(Board.piles)
+        removed[k, color]         chips out of the game
+        defeated[k, i]            players in the order they were defeated, -1 padded
+        defeated_mask[k]          bitmask of defeated players
+        current[k]                player to move
+        handoff[k]                handoff generator state, like Board.handoff
+        turns[k]                  moves applied
+
+    Moves are given as three arrays (actions, chips, targets) with the compact
+    encoding of game.models; chips[k] == PASS passes like GameEngine.apply(None).
+    Finished games are left untouched.
+    """
+
+    def __init__(self, count: int, first_players: Optional[Sequence[int]] = None, seed: Optional[int] = None):
+        if np is None:
+            raise ImportError("VectorGames needs NumPy (pip install numpy)")
+        self.count = count
+        self.rng = np.random.default_rng(seed)
+        self.hands = np.zeros((count, NUM_COLORS, NUM_COLORS), np.int8)
+        for player in range(NUM_COLORS):
+            self.hands[:, player, player] = CHIPS_PER_PLAYER
+        self.hand_sizes = np.full((count, NUM_COLORS), CHIPS_PER_PLAYER, np.int8)
+        self.piles = np.full((count, MAX_PILES, PILE_CAPACITY), -1, np.int8)
+        self.heights = np.zeros((count, MAX_PILES), np.int16)
+        self.pile_counts = np.zeros((count, MAX_PILES, NUM_COLORS), np.int8)
+        self.num_piles = np.zeros(count, np.int16)
+        self.removed = np.zeros((count, NUM_COLORS), np.int8)
+        self.defeated = np.full((count, NUM_COLORS), -1, np.int8)
+        self.num_defeated = np.zeros(count, np.int8)
+        self.defeated_mask = np.zeros(count, np.int8)
+        if first_players is None:
+            self.current = self.rng.integers(0, NUM_COLORS, count).astype(np.int8)
+        else:
+            self.current = np.asarray(first_players, np.int8).copy()
+        self.turns = np.zeros(count, np.int32)
+        self.handoff = self.rng.integers(0, 1 << 64, count, np.uint64, endpoint=False)
+
+        self._bits = 1 << np.arange(NUM_COLORS, dtype=np.int8)
+        # Lowest set bit of a color mask, -1 for an empty mask
+        self._lowest = np.array([(mask & -mask).bit_length() - 1 for mask in range(1 << NUM_COLORS)], np.int8)
+        # Set bits of a color mask: how many, and the i-th lowest
+        self._popcount = np.array([bin(mask).count("1") for mask in range(1 << NUM_COLORS)], np.uint64)
+        self._nth = np.array([[player for player in range(NUM_COLORS) if mask >> player & 1]
+                              + [-1] * (NUM_COLORS - bin(mask).count("1")) for mask in range(1 << NUM_COLORS)], np.int8)
+
+    @classmethod
+    def from_boards(cls, boards: Sequence[Board], seed: Optional[int] = None) -> 'VectorGames':
+        games = cls(len(boards), first_players=[board.current for board in boards], seed=seed)
+        for k, board in enumerate(boards):
+            if len(board.piles) > MAX_PILES:
+                raise ValueError(f"Board {k} has {len(board.piles)} piles, more than {MAX_PILES}")
+            games.hands[k] = board.hands
+            games.hand_sizes[k] = [sum(hand) for hand in board.hands]
+            games.removed[k] = board.removed
+            games.num_piles[k] = len(board.piles)
+            for index, pile in enumerate(board.piles):
+                games.piles[k, index, :len(pile.chips)] = pile.chips
+                games.heights[k, index] = len(pile.chips)
+                games.pile_counts[k, index] = pile.counts
+            games.defeated[k, :len(board.defeated)] = board.defeated
+            games.num_defeated[k] = len(board.defeated)
+            games.defeated_mask[k] = board.defeated_mask
+            games.handoff[k] = board.handoff
+        return games
+
+    def board(self, k: int) -> Board:
+        """Game k as a scalar Board."""
+        piles = [self.piles[k, index, :self.heights[k, index]].tolist() for index in range(self.num_piles[k])]
+        return Board.from_data([self.hands[k].tolist(), piles, self.removed[k].tolist(),
+                                self.defeated[k, :self.num_defeated[k]].tolist(), int(self.current[k]),
+                                int(self.handoff[k])])
+
+    @property
+    def done(self):
+        return self.num_defeated >= NUM_COLORS - 1
+
+    def winners(self):
+        """The last player standing in each finished game, -1 where the game is still running."""
+        alive = ~self.defeated_mask & ((1 << NUM_COLORS) - 1)
+        return np.where(self.done, self._lowest[alive], -1)
+
+    def _is_defeated(self, games, players):
+        return (self.defeated_mask[games] >> players) & 1 == 1
+
+    def must_pass(self, games=None):
+        """Whether each game's current player has no legal move (no chips, or already defeated)."""
+        games = np.arange(self.count) if games is None else games
+        current = self.current[games]
+        return (self.hand_sizes[games, current] == 0) | self._is_defeated(games, current)
+
+    def random_moves(self) -> Tuple:
+        """A uniformly random legal move for every running game, PASS where there is none."""
+        actions = np.zeros(self.count, np.int8)
+        chips = np.full(self.count, PASS, np.int8)
+        targets = np.zeros(self.count, np.int16)
+        g = np.flatnonzero(~self.done)
+        current = self.current[g]
+
+        held = self.hands[g, current] > 0
+        chips[g] = np.argmax(self.rng.random((len(g), NUM_COLORS), np.float32) * held, axis=1)
+
+        # Every held chip has the same targets: the piles in play, a new pile, and the three other players
+        pile_targets = np.minimum(self.num_piles[g] + 1, MAX_PILES)
+        choice = (self.rng.random(len(g), np.float32) * (pile_targets + NUM_COLORS - 1)).astype(np.int16)
+        play = choice < pile_targets
+        actions[g] = np.where(play, PLAY, TRANSFER)
+        targets[g] = np.where(play, choice, (current + 1 + choice - pile_targets) % NUM_COLORS)
+
+        chips[g[self.must_pass(g)]] = PASS
+        return actions, chips, targets
+
+    def step(self, actions, chips, targets):
+        """
+        Apply one move to every running game. Returns which games accepted their
+        move; like GameEngine.apply(), a game rejecting an illegal move is unchanged.
+        """
+        g = np.flatnonzero(~self.done)
+        actions = np.asarray(actions)[g]
+        chips = np.asarray(chips)[g]
+        targets = np.asarray(targets)[g].astype(np.intp)
+        current = self.current[g].astype(np.intp)
+        passing = chips == PASS
+        chip = np.where(passing, 0, chips).astype(np.intp)
+
+        valid = passing | (~self._is_defeated(g, current) & (self.hands[g, current, chip] > 0))
+        is_play = valid & ~passing & (actions == PLAY) & (targets >= 0) \
+            & (targets <= self.num_piles[g]) & (targets < MAX_PILES)
+        is_transfer = valid & ~passing & (actions == TRANSFER) & (targets != current) \
+            & (targets >= 0) & (targets < NUM_COLORS)
+        valid = passing | is_play | is_transfer
+
+        t = np.flatnonzero(is_transfer)
+        if len(t):
+            self.hands[g[t], targets[t], chip[t]] += 1
+            self.hands[g[t], current[t], chip[t]] -= 1
+            self.hand_sizes[g[t], targets[t]] += 1
+            self.hand_sizes[g[t], current[t]] -= 1
+
+        next_chosen = np.zeros(len(g), bool)
+        p = np.flatnonzero(is_play)
+        if len(p):
+            next_chosen[p] = self._play(g[p], current[p], chip[p], targets[p])
+
+        self._update_turn(g[valid], next_chosen[valid])
+        accepted = np.zeros(self.count, bool)
+        accepted[g] = valid
+        return accepted
+
+    def _play(self, g, current, chip, pile):
+        """Play the chips. Returns which games' plays chose the next player (like GameEngine._execute)."""
+        height = self.heights[g, pile].astype(np.intp)
+        self.piles[g, pile, height] = chip
+        self.heights[g, pile] += 1
+        self.pile_counts[g, pile, chip] += 1
+        self.hands[g, current, chip] -= 1
+        self.hand_sizes[g, current] -= 1
+        self.num_piles[g] = np.maximum(self.num_piles[g], pile + 1)
+
+        # Two chips of the same color on top: both come off; one leaves the game, the
+        # other goes to that color's player, who moves next (a defeated player's rebounds)
+        below = self.piles[g, pile, np.maximum(height - 1, 0)]
+        capture = (height >= 1) & (below == chip)
+        c = np.flatnonzero(capture)
+        if len(c):
+            gc, pc, hc, cc = g[c], pile[c], height[c], chip[c]
+            self.piles[gc, pc, hc] = -1
+            self.piles[gc, pc, hc - 1] = -1
+            self.heights[gc, pc] -= 2
+            self.pile_counts[gc, pc, cc] -= 2
+            rebound = self._is_defeated(gc, cc)
+            self.removed[gc, cc] += 1 + rebound
+            self.hands[gc, cc, cc] += ~rebound
+            self.hand_sizes[gc, cc] += ~rebound
+            self.current[gc] = np.where(rebound, current[c], cc)
+
+        next_chosen = capture.copy()
+        rest = np.flatnonzero(~capture)
+        if not len(rest):
+            return next_chosen
+        g, pile, current = g[rest], pile[rest], current[rest]
+        mask = ((self.pile_counts[g, pile] > 0) * self._bits).sum(axis=1)
+
+        # All four colors present: the deepest chip of a player still in the game moves next
+        full = mask == (1 << NUM_COLORS) - 1
+        f = np.flatnonzero(full)
+        if len(f):
+            rows = self.piles[g[f], pile[f]]
+            in_game = (rows >= 0) & ((self.defeated_mask[g[f], None] >> np.maximum(rows, 0)) & 1 == 0)
+            deepest = rows[np.arange(len(f)), np.argmax(in_game, axis=1)]
+            self.current[g[f]] = np.where(in_game.any(axis=1), deepest, current[f])
+            next_chosen[rest[f]] = in_game.any(axis=1)
+
+        # Otherwise a missing color still in the game moves next, if there is one,
+        # drawn from the handoff generator when there are several (Board.pick_handoff)
+        m = np.flatnonzero(~full)
+        if len(m):
+            missing = ~mask[m] & ~self.defeated_mask[g[m]] & ((1 << NUM_COLORS) - 1)
+            self.current[g[m]] = np.where(missing > 0, self._lowest[missing], current[m])
+            next_chosen[rest[m]] = missing > 0
+            choice = np.flatnonzero(self._popcount[missing] > 1)
+            if len(choice):
+                gh, options = g[m[choice]], missing[choice]
+                self.handoff[gh] = self.handoff[gh] * np.uint64(HANDOFF_MULTIPLIER) + np.uint64(HANDOFF_INCREMENT)
+                index = (self.handoff[gh] >> np.uint64(33)) % self._popcount[options]
+                self.current[gh] = self._nth[options, index.astype(np.intp)]
+        return next_chosen
+
+    def _update_turn(self, g, next_chosen):
+        """GameEngine.update_turn for the games in g, given which of their moves chose the next player."""
+        if not len(g):
+            return
+        current = self.current[g].astype(np.intp)
+        out_of_chips = self.hand_sizes[g, current] == 0
+
+        defeat = np.flatnonzero(out_of_chips & ~self._is_defeated(g, current))
+        if len(defeat):
+            gd = g[defeat]
+            self.defeated[gd, self.num_defeated[gd]] = current[defeat]
+            self.num_defeated[gd] += 1
+            self.defeated_mask[gd] |= (1 << current[defeat]).astype(np.int8)
+
+        advance = np.flatnonzero(out_of_chips | (~next_chosen & (self.num_defeated[g] < NUM_COLORS - 1)))
+        if len(advance):
+            ga, ca = g[advance], current[advance]
+            candidates = (ca[:, None] + np.arange(1, NUM_COLORS)) % NUM_COLORS
+            in_game = (self.defeated_mask[ga, None] >> candidates) & 1 == 0
+            following = candidates[np.arange(len(ga)), np.argmax(in_game, axis=1)]
+            self.current[ga] = np.where(in_game.any(axis=1), following, ca)
+        self.turns[g] += 1
+
+    def play_random(self, max_turns: Optional[int] = None):
+        """Play uniformly random legal moves until every game ends (or max_turns steps). Returns winners()."""
+        steps = 0
+        while not self.done.all() and (max_turns is None or steps < max_turns):
+            self.step(*self.random_moves())
+            steps += 1
+        return self.winners()
+
+    def move(self, k: int, actions, chips, targets) -> Optional[Move]:
+        """Game k's entry of a move batch as a compact move, None for a pass."""
+        if chips[k] == PASS:
+            return None
+        return int(actions[k]), int(chips[k]), int(targets[k])
@@ -1,24 +1,23 @@
+import argparse
+import asyncio
 import os
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-import asyncio
-import aiohttp
-import sys
+from fastapi.responses import PlainTextResponse
 
-print("Python executable:", sys.executable)
-print("Python version:", sys.version)
-print("Python path:", sys.path)
+# Load environment variables before the modules that read them at import time
+load_dotenv()
 
 # Create the FastAPI app
 app = FastAPI()
 
 # Import after app creation to avoid circular imports
 from api.websocket import setup_websocket
-
-# Load environment variables
-load_dotenv()
+from game import metrics
+from game.providers import client_pool, LOCAL_BASE_URL
+from game.results import result_store
 
 # Configure CORS
 app.add_middleware(
@@ -29,51 +28,70 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Validate required environment variables
-required_vars = ['OPENAI_API_KEY', 'ANTHROPIC_API_KEY']
-missing_vars = [var for var in required_vars if not os.getenv(var)]
-
-if missing_vars:
-    raise EnvironmentError(
-        f"Missing required environment variables: {', '.join(missing_vars)}\n"
-        "Please create a .env file with these variables."
-    )
-
 # Setup WebSocket routes
 setup_websocket(app)
 
-async def test_lm_studio():
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/leaderboard")
+async def leaderboard(limit: int = 100):
+    """Elo rating per model and win rate per seat over every stored game (see game.results)."""
+    if not result_store:
+        raise HTTPException(status_code=404, detail="Results are not stored; set RESULTS_DB")
+    return await asyncio.to_thread(result_store.leaderboard, limit)
+
+async def check_lm_studio():
+    """Log whether the local model server is reachable. Local players only need it once they play."""
+    import aiohttp
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get("http://127.0.0.1:1234/v1/models") as response:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5)) as session:
+            async with session.get(f"{LOCAL_BASE_URL}/models") as response:
                 if response.status == 200:
-                    print("Successfully connected to LM Studio")
                     models = await response.json()
-                    print("Available models:", [m["id"] for m in models["data"]])
+                    print(f"LM Studio available with models: {[m['id'] for m in models['data']]}")
                 else:
-                    print("Failed to connect to LM Studio")
+                    print(f"LM Studio at {LOCAL_BASE_URL} answered with status {response.status}")
     except Exception as e:
-        print(f"Error connecting to LM Studio: {e}")
+        print(f"LM Studio not reachable at {LOCAL_BASE_URL}: {e}")
+
+@app.on_event("startup")
+async def start_background_checks():
+    # Runs alongside the server so startup never waits on the local model server
+    app.state.lm_studio_check = asyncio.create_task(check_lm_studio())
+
+@app.on_event("shutdown")
+async def close_shared_resources():
+    await client_pool.aclose()
+    if result_store:
+        await asyncio.to_thread(result_store.close)  # Write the results still queued
 
 def main():
     """
     Main entry point for the So Long Sucker AI Battle application.
+
+    Runs with the auto-reloader by default. --production (or APP_ENV=production)
+    turns it off and starts --workers processes. Each worker hosts its own games,
+    so clients of one game must reach the same worker.
     """
-    print("Starting So Long Sucker AI Battle server...")
-    print("Make sure LM Studio is running locally at http://127.0.0.1:1234 with the required models:")
-    print("- llama-3.2-3b-instruct")
-    print("- qwen2-0.5b-instruct")
-    
-    # Test LM Studio connection
-    asyncio.run(test_lm_studio())
-    
+    parser = argparse.ArgumentParser(description="So Long Sucker AI Battle server")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--production", action="store_true", default=os.getenv("APP_ENV") == "production",
+                        help="no reloader; use --workers processes")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")),
+                        help="worker processes in production mode")
+    args = parser.parse_args()
+
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
+        host=args.host,
+        port=args.port,
+        reload=not args.production,
+        workers=args.workers if args.production else None,
         log_level="info"
     )
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,121 @@
+"""
+CompletionBatcher against a stub completions client.
+
+Usage:
+    python -m pytest backend/tests
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from game.batching import CompletionBatcher
+
+class StubError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+class StubCompletions:
+    """Answers each prompt with "re:<prompt>"; list prompts come back with their choices in reverse order."""
+
+    def __init__(self, batch_error=None, drop_choice=False):
+        self.batch_error = batch_error  # Raised for list prompts
+        self.drop_choice = drop_choice  # Leave one choice out of list answers
+        self.calls = []
+
+    async def create(self, model, prompt, **params):
+        self.calls.append(prompt)
+        await asyncio.sleep(0)
+        if isinstance(prompt, str):
+            return SimpleNamespace(choices=[SimpleNamespace(index=0, text=f"re:{prompt}")])
+        if self.batch_error:
+            raise self.batch_error
+        choices = [SimpleNamespace(index=i, text=f"re:{p}") for i, p in enumerate(prompt)]
+        if self.drop_choice:
+            choices.pop()
+        return SimpleNamespace(choices=choices[::-1])
+
+def stub_client(**kwargs):
+    return SimpleNamespace(completions=StubCompletions(**kwargs))
+
+async def complete_all(batcher, client, prompts, **params):
+    return await asyncio.gather(*(batcher.complete(client, "stub", prompt, **params) for prompt in prompts),
+                                return_exceptions=True)
+
+def test_concurrent_prompts_share_one_request():
+    batcher = CompletionBatcher(window=0.01)
+    client = stub_client()
+    prompts = [f"p{i}" for i in range(5)]
+
+    texts = asyncio.run(complete_all(batcher, client, prompts))
+
+    assert texts == [f"re:{prompt}" for prompt in prompts]  # Routed back by choice index
+    assert client.completions.calls == [prompts]
+    assert batcher.stats() == {"batches": 1, "prompts": 5, "meanBatchSize": 5.0}
+    assert not batcher._sending
+
+def test_full_batch_is_sent_early():
+    batcher = CompletionBatcher(window=60, max_batch=3)
+    client = stub_client()
+
+    texts = asyncio.run(asyncio.wait_for(complete_all(batcher, client, ["a", "b", "c"]), 5))
+
+    assert texts == ["re:a", "re:b", "re:c"]
+    assert client.completions.calls == [["a", "b", "c"]]
+
+def test_different_parameters_are_not_batched_together():
+    batcher = CompletionBatcher(window=0.01)
+    client = stub_client()
+
+    async def run():
+        return await asyncio.gather(batcher.complete(client, "stub", "a", temperature=0.1),
+                                    batcher.complete(client, "stub", "b", temperature=0.9))
+
+    assert asyncio.run(run()) == ["re:a", "re:b"]
+    assert sorted(client.completions.calls) == ["a", "b"]
+
+@pytest.mark.parametrize("client_kwargs", [{"batch_error": StubError(400)}, {"drop_choice": True}])
+def test_server_that_cannot_batch_gets_single_requests_from_then_on(client_kwargs):
+    batcher = CompletionBatcher(window=0.01)
+    client = stub_client(**client_kwargs)
+
+    async def run():
+        first = await complete_all(batcher, client, ["a", "b"])
+        second = await complete_all(batcher, client, ["c", "d"])
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first == ["re:a", "re:b"]
+    assert second == ["re:c", "re:d"]
+    assert client.completions.calls == [["a", "b"], "a", "b", "c", "d"]
+
+def test_transient_failure_fails_only_that_batch():
+    batcher = CompletionBatcher(window=0.01)
+    client = stub_client(batch_error=StubError(503))
+
+    async def run():
+        first = await complete_all(batcher, client, ["a", "b"])
+        client.completions.batch_error = None
+        second = await complete_all(batcher, client, ["c", "d"])
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert all(isinstance(result, StubError) for result in first)
+    assert second == ["re:c", "re:d"]
+    assert client.completions.calls == [["a", "b"], ["c", "d"]]
+
+def test_caller_that_gave_up_does_not_break_the_batch():
+    batcher = CompletionBatcher(window=0.01)
+    client = stub_client()
+
+    async def run():
+        impatient = asyncio.ensure_future(batcher.complete(client, "stub", "a"))
+        patient = asyncio.ensure_future(batcher.complete(client, "stub", "b"))
+        await asyncio.sleep(0)
+        impatient.cancel()
+        return await patient
+
+    assert asyncio.run(run()) == "re:b"
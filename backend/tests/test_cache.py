@@ -0,0 +1,46 @@
+"""
+DecisionCache and the position fingerprint.
+
+Usage:
+    python -m pytest backend/tests
+"""
+from game.cache import DecisionCache, fingerprint, relabel_move, restore_move
+from game.models import Board, PLAY, TRANSFER
+
+def test_decisions_survive_reopening_the_file(tmp_path):
+    path = str(tmp_path / "decisions.db")
+    cache = DecisionCache(path=path)
+    for i in range(50):
+        cache.put(f"key{i}", (PLAY, 0, i % 10))
+    assert cache.get("key7") == (PLAY, 0, 7)  # Served from memory before the write lands
+    cache.close()
+
+    reopened = DecisionCache(path=path)
+    assert reopened.get("key49") == (PLAY, 0, 9)
+    assert reopened.get("missing") is None
+    assert reopened.stats()["hits"] == 1
+    reopened.close()
+
+def test_relabelled_positions_share_a_key():
+    board = Board(0)
+    board.hands[1][1] -= 2
+    board.hands[2][1] += 2
+    swapped = Board(0)
+    swapped.hands[3][3] -= 2
+    swapped.hands[2][3] += 2
+
+    key, relabel = fingerprint(board, 0)
+    swapped_key, swapped_relabel = fingerprint(swapped, 0)
+    assert key == swapped_key
+
+    move = (TRANSFER, 0, 2)
+    assert restore_move(relabel_move(move, relabel), relabel) == move
+
+def test_opponent_hand_sizes_are_part_of_the_key():
+    board = Board(0)
+    board.hands[1][1] -= 1
+    board.hands[2][1] += 1
+    other = Board(0)
+    other.hands[1][1] -= 2
+    other.hands[2][1] += 2
+    assert fingerprint(board, 0)[0] != fingerprint(other, 0)[0]
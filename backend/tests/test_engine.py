@@ -0,0 +1,21 @@
+"""
+The rules engine's property and differential checks (tools.fuzz, tools.bench_vector) on small batches.
+
+Usage:
+    python -m pytest backend/tests
+"""
+import pytest
+
+from tools.fuzz import fuzz_batch
+
+@pytest.mark.parametrize("seed", range(5))
+def test_engine_variants_agree_and_keep_invariants(seed):
+    totals = fuzz_batch(20, seed)
+    assert totals["games"] == 20
+    assert totals["rejected"] > 0  # The arbitrary moves reached the engines
+
+def test_vector_games_match_engine():
+    pytest.importorskip("numpy")
+    from tools.bench_vector import check_against_engine
+
+    assert check_against_engine(50) > 0
@@ -0,0 +1,136 @@
+"""
+Microbenchmarks for GameEngine.
+
+Measures clone() and apply()/undo() throughput on positions taken from random
+games, which is the inner loop of any lookahead player, plus the rules
+themselves: execute_move(), update_turn() and whole random games.
+
+Usage (from the backend directory):
+    python -m tools.bench_engine
+    python -m tools.bench_engine --positions 200 --repeat 20000 --games 10000
+"""
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from game.engine import GameEngine
+from game.models import Board, Move, PLAY, TRANSFER, NUM_COLORS, decode_move
+
+def _random_move(engine: GameEngine, rng: random.Random) -> Move:
+    """Draw moves until one is legal for the current player."""
+    board = engine.state.board
+    hand = board.hands[board.current]
+    colors = [c for c in range(NUM_COLORS) if hand[c]]
+    while True:
+        chip = rng.choice(colors)
+        if rng.random() < 0.8:
+            move = (PLAY, chip, rng.randint(0, len(board.piles)))
+        else:
+            move = (TRANSFER, chip, rng.randrange(NUM_COLORS))
+        if move[0] == PLAY or move[2] != board.current:
+            return move
+
+def sample_positions(count: int, seed: int = 0) -> List[GameEngine]:
+    """Engines paused at random points of random games, each with a legal move pending."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        engine = GameEngine(players={})  # Game data only, no model clients
+        stop = rng.randint(0, 40)
+        for _ in range(stop):
+            if engine._check_game_over():
+                break
+            board = engine.state.board
+            engine.apply(_random_move(engine, rng) if any(board.hands[board.current]) else None)
+        board = engine.state.board
+        if not engine._check_game_over() and any(board.hands[board.current]):
+            positions.append(engine.clone())
+    return positions
+
+def _rate(operations: int, elapsed: float) -> float:
+    return operations / elapsed if elapsed else float("inf")
+
+def bench_clone(positions: List[GameEngine], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for engine in positions:
+            engine.clone()
+    return _rate(repeat * len(positions), time.perf_counter() - start)
+
+def bench_apply_undo(positions: List[GameEngine], repeat: int, seed: int = 0) -> float:
+    rng = random.Random(seed)
+    moves = [_random_move(engine, rng) for engine in positions]
+    pairs = list(zip(positions, moves))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for engine, move in pairs:
+            engine.apply(move)
+            engine.undo()
+    return _rate(repeat * len(pairs), time.perf_counter() - start)
+
+def bench_execute_move(positions: List[GameEngine], repeat: int, seed: int = 0) -> float:
+    """execute_move() with move dicts as the players send them, on a fresh copy of each position."""
+    rng = random.Random(seed)
+    pairs = [(engine.state.board, decode_move(_random_move(engine, rng))) for engine in positions]
+    engine = GameEngine.from_board(Board(0))
+    copy_time = 0.0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board, move in pairs:
+            copy_start = time.perf_counter()
+            engine.state.board = board.copy()
+            copy_time += time.perf_counter() - copy_start
+            engine.execute_move(move)
+    return _rate(repeat * len(pairs), time.perf_counter() - start - copy_time)
+
+def bench_update_turn(positions: List[GameEngine], repeat: int) -> float:
+    boards = [engine.state.board for engine in positions]
+    engine = GameEngine.from_board(Board(0))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board in boards:
+            current = board.current
+            engine.state.board = board
+            engine.update_turn()
+            board.current = current
+    return _rate(repeat * len(boards), time.perf_counter() - start)
+
+def bench_random_games(games: int, seed: int = 0) -> Dict[str, float]:
+    """Whole games of random legal moves through apply(). Returns games/s and moves/s."""
+    rng = random.Random(seed)
+    moves = 0
+    start = time.perf_counter()
+    for _ in range(games):
+        engine = GameEngine.from_board(Board(rng.randrange(NUM_COLORS)))
+        while not engine._check_game_over():
+            board = engine.state.board
+            engine.apply(rng.choice(board.legal_moves(board.current) or [None]))
+            moves += 1
+    elapsed = time.perf_counter() - start
+    return {"games": _rate(games, elapsed), "moves": _rate(moves, elapsed)}
+
+def run(positions: int = 100, repeat: int = 5000, games: int = 2000) -> Dict[str, float]:
+    sampled = sample_positions(positions)
+    random_games = bench_random_games(games)
+    return {
+        "clone": bench_clone(sampled, repeat),
+        "apply+undo": bench_apply_undo(sampled, repeat),
+        "execute_move": bench_execute_move(sampled, repeat),
+        "update_turn": bench_update_turn(sampled, repeat),
+        "random games": random_games["games"],
+        "random moves": random_games["moves"]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GameEngine clone and undo throughput.")
+    parser.add_argument("--positions", type=int, default=100, help="number of sampled positions")
+    parser.add_argument("--repeat", type=int, default=5000, help="passes over the sampled positions")
+    parser.add_argument("--games", type=int, default=2000, help="random games played start to finish")
+    args = parser.parse_args()
+
+    for name, rate in run(args.positions, args.repeat, args.games).items():
+        print(f"{name:<14} {rate:>12,.0f} ops/s")
+
+if __name__ == "__main__":
+    main()
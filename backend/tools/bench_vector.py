@@ -0,0 +1,78 @@
+"""
+Checks game.vector against the scalar engine and measures its rollout throughput.
+
+The check plays random games in both, move by move, including a share of
+illegal moves that both must reject, and compares every board.
+
+Usage (from the backend directory):
+    python -m tools.bench_vector
+    python -m tools.bench_vector --check-games 500 --games 100000
+"""
+import argparse
+import time
+from typing import Dict
+
+import numpy as np
+
+from game.engine import GameEngine
+from game.models import COLOR_INDEX, NUM_COLORS, MAX_PILES
+from game.vector import VectorGames
+
+def check_against_engine(games: int = 200, seed: int = 0, illegal_rate: float = 0.1) -> int:
+    """Play the same moves on VectorGames and on GameEngines. Returns the number of moves compared."""
+    vector = VectorGames(games, seed=seed)
+    engines = [GameEngine.from_board(vector.board(k)) for k in range(games)]
+    rng = np.random.default_rng(seed + 1)
+    compared = 0
+
+    while not vector.done.all():
+        actions, chips, targets = vector.random_moves()
+        # Swap in arbitrary moves now and then; both sides must reject the illegal ones
+        scramble = (rng.random(games) < illegal_rate) & (chips >= 0)
+        actions[scramble] = rng.integers(0, 2, scramble.sum())
+        chips[scramble] = rng.integers(0, NUM_COLORS, scramble.sum())
+        targets[scramble] = rng.integers(-1, MAX_PILES, scramble.sum())
+
+        running = ~vector.done
+        accepted = vector.step(actions, chips, targets)
+        for k in np.flatnonzero(running):
+            expected = engines[k].apply(vector.move(k, actions, chips, targets))
+            if expected != accepted[k]:
+                raise AssertionError(f"Game {k} turn {vector.turns[k]}: engine accepted={expected}, "
+                                     f"vector accepted={accepted[k]}")
+            if engines[k].state.board.to_data() != vector.board(k).to_data():
+                raise AssertionError(f"Game {k} turn {vector.turns[k]}: boards differ\n"
+                                     f"engine {engines[k].state.board.to_data()}\n"
+                                     f"vector {vector.board(k).to_data()}")
+            compared += 1
+
+    winners = vector.winners()
+    for k, engine in enumerate(engines):
+        winner = engine.get_winner()
+        if winners[k] != COLOR_INDEX[winner]:
+            raise AssertionError(f"Game {k}: engine winner {winner}, vector winner {winners[k]}")
+    return compared
+
+def bench_rollouts(games: int, seed: int = 0) -> Dict[str, float]:
+    vector = VectorGames(games, seed=seed)
+    start = time.perf_counter()
+    vector.play_random()
+    elapsed = time.perf_counter() - start
+    moves = int(vector.turns.sum())
+    return {"games": games, "moves": moves, "seconds": elapsed, "moves/s": moves / elapsed}
+
+def main():
+    parser = argparse.ArgumentParser(description="Check game.vector against GameEngine and benchmark it.")
+    parser.add_argument("--check-games", type=int, default=200, help="games replayed on the scalar engine")
+    parser.add_argument("--games", type=int, default=20000, help="games in the throughput run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    compared = check_against_engine(args.check_games, args.seed)
+    print(f"check        {compared:,} moves identical to GameEngine")
+    result = bench_rollouts(args.games, args.seed)
+    print(f"rollouts     {result['games']:,} games, {result['moves']:,} moves in {result['seconds']:.2f}s "
+          f"({result['moves/s']:,.0f} moves/s)")
+
+if __name__ == "__main__":
+    main()
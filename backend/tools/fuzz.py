@@ -0,0 +1,226 @@
+"""
+Property and differential fuzzer for the rules engine.
+
+Plays random games on the reference engine (GameEngine.apply), mostly legal
+moves plus a share of arbitrary ones that must be rejected, and checks after
+every move that:
+  - every color's 7 chips are accounted for across hands, piles and removed
+  - each pile's counts and color mask match its chips
+  - the defeated list and mask agree, and the game ends with one player left
+  - the player to move is still in the game while it runs
+  - undoing the whole game restores the starting board
+
+Every variant in VARIANTS plays the same moves in lockstep and must accept
+the same moves and reach the same board. Add faster engines there before
+trusting them.
+
+Usage (from the backend directory):
+    python -m tools.fuzz
+    python -m tools.fuzz --games 1000000 --workers 8
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from game.engine import GameEngine
+from game.models import Board, Move, PLAY, TRANSFER, NUM_COLORS, CHIPS_PER_PLAYER, MAX_PILES, FULL_MASK, decode_move
+from game.vector import np, VectorGames
+
+class FuzzFailure(AssertionError):
+    pass
+
+def check_invariants(board: Board, game_over: bool):
+    for color in range(NUM_COLORS):
+        held = sum(hand[color] for hand in board.hands)
+        piled = sum(pile.counts[color] for pile in board.piles)
+        if held + piled + board.removed[color] != CHIPS_PER_PLAYER:
+            raise FuzzFailure(f"{color}: {held} held + {piled} piled + {board.removed[color]} removed "
+                              f"!= {CHIPS_PER_PLAYER}")
+    if any(count < 0 for hand in board.hands for count in hand):
+        raise FuzzFailure(f"Negative chip count in {board.hands}")
+
+    if len(board.piles) > MAX_PILES:
+        raise FuzzFailure(f"{len(board.piles)} piles")
+    for index, pile in enumerate(board.piles):
+        counts = [list(pile.chips).count(color) for color in range(NUM_COLORS)]
+        mask = sum(1 << color for color in range(NUM_COLORS) if counts[color])
+        if pile.counts != counts or pile.mask != mask:
+            raise FuzzFailure(f"Pile {index} {list(pile.chips)} has counts {pile.counts} mask {pile.mask}")
+
+    if len(set(board.defeated)) != len(board.defeated) \
+            or board.defeated_mask != sum(1 << player for player in board.defeated):
+        raise FuzzFailure(f"Defeated {board.defeated} with mask {board.defeated_mask}")
+    if game_over:
+        if bin(FULL_MASK & ~board.defeated_mask).count("1") != 1:
+            raise FuzzFailure(f"Game over with defeated {board.defeated}")
+    elif board.is_defeated(board.current):
+        raise FuzzFailure(f"Defeated player {board.current} to move")
+
+class EngineVariant:
+    """Reference-compatible variant built from GameEngines; subclasses change how moves are applied."""
+
+    def __init__(self, boards: List[Board]):
+        self.engines = [GameEngine.from_board(board.copy()) for board in boards]
+
+    def apply(self, k: int, move: Optional[Move]) -> bool:
+        return self.engines[k].apply(move)
+
+    def step(self, moves: Dict[int, Optional[Move]]) -> Dict[int, bool]:
+        return {k: self.apply(k, move) for k, move in moves.items()}
+
+    def board(self, k: int) -> Board:
+        return self.engines[k].state.board
+
+class ExecuteMoveVariant(EngineVariant):
+    """The path play_turn() takes: move dicts through execute_move(), then update_turn()."""
+
+    def apply(self, k: int, move: Optional[Move]) -> bool:
+        engine = self.engines[k]
+        if move is not None and move[0] == TRANSFER and not 0 <= move[2] < NUM_COLORS:
+            return False  # Not expressible as a move dict; the reference rejects it too
+        if move is not None and not engine.execute_move(decode_move(move)):
+            return False
+        engine.update_turn()
+        return True
+
+class UndoRedoVariant(EngineVariant):
+    """Every move is applied, undone and redone."""
+
+    def apply(self, k: int, move: Optional[Move]) -> bool:
+        engine = self.engines[k]
+        if not engine.apply(move):
+            return False
+        engine.undo()
+        return engine.redo()
+
+class CopyVariant(EngineVariant):
+    """Every move is played on a fresh copy of the board, restored through to_data()/from_data()."""
+
+    def apply(self, k: int, move: Optional[Move]) -> bool:
+        engine = self.engines[k]
+        engine.state.board = Board.from_data(engine.state.board.copy().to_data())
+        return engine.apply(move)
+
+class VectorVariant:
+    """game.vector.VectorGames, all games in one batch."""
+
+    def __init__(self, boards: List[Board]):
+        self.games = VectorGames.from_boards(boards)
+
+    def step(self, moves: Dict[int, Optional[Move]]) -> Dict[int, bool]:
+        actions = np.zeros(self.games.count, np.int8)
+        chips = np.full(self.games.count, -1, np.int8)
+        targets = np.zeros(self.games.count, np.int16)
+        for k, move in moves.items():
+            if move is not None:
+                actions[k], chips[k], targets[k] = move
+        accepted = self.games.step(actions, chips, targets)
+        return {k: bool(accepted[k]) for k in moves}
+
+    def board(self, k: int) -> Board:
+        return self.games.board(k)
+
+VARIANTS = {
+    "execute_move": ExecuteMoveVariant,
+    "undo/redo": UndoRedoVariant,
+    "copy": CopyVariant
+}
+if np is not None:
+    VARIANTS["vector"] = VectorVariant
+
+def _fuzz_move(board: Board, rng: random.Random, illegal_rate: float) -> Optional[Move]:
+    """A random legal move (None when there is none), or now and then an arbitrary one."""
+    if rng.random() < illegal_rate:
+        if rng.random() < 0.5:
+            # Piles in range, just past the next new one, or well past MAX_PILES
+            target = rng.choice((rng.randrange(-1, MAX_PILES), len(board.piles) + rng.randrange(1, 4),
+                                 rng.randrange(MAX_PILES, 4 * MAX_PILES), rng.randrange(1 << 14)))
+            return PLAY, rng.randrange(NUM_COLORS), target
+        return TRANSFER, rng.randrange(NUM_COLORS), rng.randrange(-1, NUM_COLORS + 1)
+    return rng.choice(board.legal_moves(board.current) or [None])
+
+def fuzz_batch(games: int, seed: int, illegal_rate: float = 0.1, max_moves: int = 1000) -> Dict[str, int]:
+    """Play a batch of games in lockstep on the reference engine and every variant. Raises FuzzFailure."""
+    rng = random.Random(seed)
+    starts = [Board(rng.randrange(NUM_COLORS), rng.getrandbits(64)) for _ in range(games)]
+    reference = [GameEngine.from_board(board.copy()) for board in starts]
+    variants = {name: variant(starts) for name, variant in VARIANTS.items()}
+    moves = rejected = 0
+
+    for _ in range(max_moves):
+        running = [k for k, engine in enumerate(reference) if not engine._check_game_over()]
+        if not running:
+            break
+
+        step = {k: _fuzz_move(reference[k].state.board, rng, illegal_rate) for k in running}
+        accepted = {k: reference[k].apply(move) for k, move in step.items()}
+        moves += len(step)
+        rejected += sum(1 for ok in accepted.values() if not ok)
+        for k in running:
+            engine = reference[k]
+            try:
+                check_invariants(engine.state.board, engine._check_game_over())
+            except FuzzFailure as e:
+                raise FuzzFailure(f"seed {seed} game {k} after {step[k]}: {e}")
+
+        for name, variant in variants.items():
+            results = variant.step(step)
+            for k in running:
+                if results[k] != accepted[k]:
+                    raise FuzzFailure(f"{name}: seed {seed} game {k} move {step[k]} accepted={results[k]}, "
+                                      f"reference accepted={accepted[k]}")
+                if variant.board(k).to_data() != reference[k].state.board.to_data():
+                    raise FuzzFailure(f"{name}: seed {seed} game {k} after {step[k]}\n"
+                                      f"  reference {reference[k].state.board.to_data()}\n"
+                                      f"  {name} {variant.board(k).to_data()}")
+    else:
+        raise FuzzFailure(f"seed {seed}: games still running after {max_moves} moves")
+
+    for k, engine in enumerate(reference):
+        while engine.history:
+            engine.undo()
+        if engine.state.board.to_data() != starts[k].to_data():
+            raise FuzzFailure(f"seed {seed} game {k}: undoing the game did not restore the start")
+
+    return {"games": games, "moves": moves, "rejected": rejected}
+
+def _fuzz_chunk(seeds: List[int], batch: int, illegal_rate: float) -> Dict[str, int]:
+    totals = {"games": 0, "moves": 0, "rejected": 0}
+    for seed in seeds:
+        for key, value in fuzz_batch(batch, seed, illegal_rate).items():
+            totals[key] += value
+    return totals
+
+def run(games: int, workers: int = 1, batch: int = 100, seed: int = 0, illegal_rate: float = 0.1) -> Dict[str, int]:
+    seeds = list(range(seed, seed + max(1, games // batch)))
+    chunks = [seeds[i::workers] for i in range(workers) if seeds[i::workers]]
+    totals = {"games": 0, "moves": 0, "rejected": 0}
+    if workers <= 1:
+        results = [_fuzz_chunk(seeds, batch, illegal_rate)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_fuzz_chunk, chunks, [batch] * len(chunks), [illegal_rate] * len(chunks)))
+    for result in results:
+        for key, value in result.items():
+            totals[key] += value
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description="Fuzz the rules engine and compare it with its variants.")
+    parser.add_argument("--games", type=int, default=2000, help="games to play (rounded down to whole batches)")
+    parser.add_argument("--batch", type=int, default=100, help="games played in lockstep per seed")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="first batch seed; batches use consecutive seeds")
+    parser.add_argument("--illegal-rate", type=float, default=0.1, help="share of arbitrary, often illegal, moves")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    totals = run(args.games, args.workers, args.batch, args.seed, args.illegal_rate)
+    elapsed = time.perf_counter() - start
+    print(f"{totals['games']:,} games, {totals['moves']:,} moves ({totals['rejected']:,} rejected) "
+          f"in {elapsed:.1f}s; variants checked: {', '.join(VARIANTS)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+from .runner import GameResult, TournamentReport, run_tournament
+from .coordinator import Coordinator, run_worker
+
+__all__ = ['GameResult', 'TournamentReport', 'run_tournament', 'Coordinator', 'run_worker']
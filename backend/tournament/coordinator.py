@@ -0,0 +1,325 @@
+"""
+Multi-node tournaments: a coordinator hands out shards of games over HTTP
+and any number of worker nodes play them.
+
+A shard is a list of game indices. Game i is seeded with game_seed(seed, i),
+so a shard that is retried on another node plays out exactly as it would
+have the first time. Workers lease a shard, play it with the runner's
+_play_chunk and post the results back. A shard that fails, whose games end
+in errors (a missing API key, an unreachable model server), or whose lease
+runs out because its worker died, goes back on the queue with the games it
+still lacks, up to max_attempts times; after that its games are reported as
+errors.
+
+The protocol is JSON over plain HTTP, stdlib only:
+    POST /lease     {"worker": id}                -> a shard, {"wait": s} or {"done": true}
+    POST /complete  {"shard": n, "worker": id, "results": [...]}
+    POST /fail      {"shard": n, "worker": id, "error": "..."}
+    GET  /status    progress
+
+Usage (from the backend directory):
+    python -m tournament.coordinator serve --games 10000 --lineup random,greedy,mcts:200,random --port 8765
+    python -m tournament.coordinator work --url http://coordinator:8765 --processes 8
+    python -m tournament.coordinator local --games 200 --nodes 3     # everything on this host
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, List, Optional
+
+from .runner import GameResult, TournamentReport, DEFAULT_MAX_MOVES, _play_chunk
+
+class Coordinator:
+    """Shard queue and results of one tournament. Thread-safe; served by serve()."""
+
+    def __init__(self, num_games: int, lineup: Optional[str] = None, seed: Optional[int] = None,
+                 shard_size: int = 20, max_moves: int = DEFAULT_MAX_MOVES, lease_timeout: float = 600.0,
+                 max_attempts: int = 3):
+        self.lineup = lineup
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.max_moves = max_moves
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.shards: List[List[int]] = [list(range(i, min(i + shard_size, num_games)))
+                                        for i in range(0, num_games, shard_size)]
+        self.pending: Deque[int] = deque(range(len(self.shards)))
+        self.leases: Dict[int, tuple] = {}  # shard -> (worker, expires at)
+        self.attempts: Dict[int, int] = {}
+        self.results: Dict[int, GameResult] = {}  # game index -> result
+        self.workers: Dict[str, int] = {}  # worker -> shards completed
+        self.retries = 0
+        self.started = time.perf_counter()
+        self.finished = threading.Event()
+        self._lock = threading.Lock()
+        if not self.shards:
+            self.finished.set()
+
+    def _expire_leases(self):
+        now = time.monotonic()
+        for shard, (worker, expires) in list(self.leases.items()):
+            if expires < now:
+                print(f"Shard {shard} timed out on {worker}")
+                self._retry(shard, f"lease expired on {worker}")
+
+    def _retry(self, shard: int, error: str):
+        self.leases.pop(shard, None)
+        if self.attempts.get(shard, 0) >= self.max_attempts:
+            print(f"Shard {shard} failed {self.max_attempts} times, giving up: {error}")
+            for index in self.shards[shard]:
+                self.results.setdefault(index, GameResult(index, None, {}, 0, 0.0, error=error))
+            self._check_finished()
+        else:
+            self.retries += 1
+            self.pending.appendleft(shard)
+
+    def _check_finished(self):
+        if len(self.results) >= sum(len(shard) for shard in self.shards):
+            self.finished.set()
+
+    def _open(self, shard: int) -> bool:
+        return any(index not in self.results for index in self.shards[shard])
+
+    def lease(self, worker: str) -> Dict:
+        with self._lock:
+            self._expire_leases()
+            while self.pending:
+                shard = self.pending.popleft()
+                if not self._open(shard):
+                    continue  # Completed by an earlier lease that came back late
+                self.attempts[shard] = self.attempts.get(shard, 0) + 1
+                self.leases[shard] = (worker, time.monotonic() + self.lease_timeout)
+                indices = [index for index in self.shards[shard] if index not in self.results]
+                return {"shard": shard, "indices": indices, "lineup": self.lineup,
+                        "seed": self.seed, "maxMoves": self.max_moves}
+            if self.finished.is_set():
+                return {"done": True}
+            return {"wait": 1.0}  # Everything is leased; a shard may still come back
+
+    def complete(self, shard: int, worker: str, results: List[Dict]):
+        """Store a shard's results. Games that ended in an error send the shard back for another attempt."""
+        with self._lock:
+            errors = [result["error"] for result in results if result.get("error")]
+            last_attempt = self.attempts.get(shard, 0) >= self.max_attempts
+            for result in results:
+                if not result.get("error") or last_attempt:
+                    self.results.setdefault(result["game_index"], GameResult(**result))
+            self.workers[worker] = self.workers.get(worker, 0) + 1
+            if errors and self.leases.get(shard, (None,))[0] == worker and self._open(shard):
+                print(f"Shard {shard}: {len(errors)} games failed on {worker}: {errors[0]}")
+                self._retry(shard, errors[0])
+            else:
+                self.leases.pop(shard, None)  # Errors from an outdated lease are left to its current holder
+            self._check_finished()
+
+    def fail(self, shard: int, worker: str, error: str):
+        with self._lock:
+            print(f"Shard {shard} failed on {worker}: {error}")
+            if self.leases.get(shard, (None,))[0] == worker and self._open(shard):
+                self._retry(shard, error)
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "games": sum(len(shard) for shard in self.shards),
+                "completed": len(self.results),
+                "shards": len(self.shards),
+                "pending": len(self.pending),
+                "leased": len(self.leases),
+                "retries": self.retries,
+                "workers": dict(self.workers),
+                "seed": self.seed,
+                "done": self.finished.is_set()
+            }
+
+    def report(self) -> TournamentReport:
+        with self._lock:
+            results = [self.results[index] for index in sorted(self.results)]
+        return TournamentReport(results=results, duration=time.perf_counter() - self.started, seed=self.seed)
+
+    def serve(self, host: str = "0.0.0.0", port: int = 8765) -> ThreadingHTTPServer:
+        """Start answering workers on a background thread. Returns the server; server_address has the port."""
+        server = ThreadingHTTPServer((host, port), _handler(self))
+        threading.Thread(target=server.serve_forever, name="coordinator", daemon=True).start()
+        return server
+
+def _handler(coordinator: Coordinator):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, body: Dict, status: int = 200):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/status":
+                self._reply(coordinator.status())
+            else:
+                self._reply({"error": "not found"}, 404)
+
+        def do_POST(self):
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path == "/lease":
+                    self._reply(coordinator.lease(body["worker"]))
+                elif self.path == "/complete":
+                    coordinator.complete(body["shard"], body["worker"], body["results"])
+                    self._reply({"ok": True})
+                elif self.path == "/fail":
+                    coordinator.fail(body["shard"], body["worker"], body.get("error", ""))
+                    self._reply({"ok": True})
+                else:
+                    self._reply({"error": "not found"}, 404)
+            except (ValueError, KeyError, TypeError) as e:
+                self._reply({"error": f"bad request: {e!r}"}, 400)
+
+        def log_message(self, format, *args):
+            pass  # One line per lease would drown the progress output
+
+    return Handler
+
+def _post(url: str, path: str, body: Dict, retries: int = 5) -> Dict:
+    """POST JSON to the coordinator, retrying with backoff while it is unreachable."""
+    request = urllib.request.Request(url.rstrip("/") + path, data=json.dumps(body).encode(),
+                                     headers={"Content-Type": "application/json"})
+    for attempt in range(retries):
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return json.loads(response.read())
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            if attempt == retries - 1:
+                raise
+            time.sleep(2 ** attempt)
+
+def run_worker(url: str, concurrency: int = 1, record_dir: Optional[str] = None,
+               cache_path: Optional[str] = None, results_path: Optional[str] = None,
+               worker: Optional[str] = None) -> int:
+    """
+    Lease and play shards from the coordinator at `url` until the tournament is
+    done. Returns the number of games played. The options are those of the
+    runner and apply to this node only.
+    """
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    played = 0
+    if record_dir:
+        os.makedirs(record_dir, exist_ok=True)
+    while True:
+        lease = _post(url, "/lease", {"worker": worker})
+        if lease.get("done"):
+            return played
+        if "wait" in lease:
+            time.sleep(lease["wait"])
+            continue
+
+        shard = lease["shard"]
+        try:
+            results = _play_chunk(lease["indices"], lease["lineup"], lease["maxMoves"], concurrency,
+                                  record_dir, cache_path, lease["seed"], results_path)
+        except Exception as e:
+            _post(url, "/fail", {"shard": shard, "worker": worker, "error": repr(e)})
+            continue
+        _post(url, "/complete", {"shard": shard, "worker": worker, "results": [asdict(r) for r in results]})
+        played += len(results)
+
+def _worker_process(url: str, concurrency: int, record_dir: Optional[str], cache_path: Optional[str],
+                    results_path: Optional[str]):
+    played = run_worker(url, concurrency, record_dir, cache_path, results_path)
+    print(f"Worker {socket.gethostname()}-{os.getpid()} played {played} games")
+
+def start_workers(url: str, processes: int, concurrency: int = 1, record_dir: Optional[str] = None,
+                  cache_path: Optional[str] = None,
+                  results_path: Optional[str] = None) -> List[multiprocessing.Process]:
+    """Start `processes` worker loops against the coordinator, one process each."""
+    workers = [multiprocessing.Process(target=_worker_process,
+                                       args=(url, concurrency, record_dir, cache_path, results_path))
+               for _ in range(processes)]
+    for process in workers:
+        process.start()
+    return workers
+
+def _wait_and_report(coordinator: Coordinator, json_path: Optional[str]):
+    last = None
+    while not coordinator.finished.wait(5.0):
+        status = coordinator.status()
+        progress = (status["completed"], status["leased"], status["retries"])
+        if progress != last:
+            print(f"{status['completed']}/{status['games']} games, {status['leased']} shards out, "
+                  f"{status['retries']} retries")
+            last = progress
+    report = coordinator.report()
+    print(report.format())
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(report.to_dict(), f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Spread a tournament across worker nodes.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run the coordinator until every game is played")
+    local = commands.add_parser("local", help="run a coordinator and --nodes worker processes on this host")
+    for command in (serve, local):
+        command.add_argument("--games", type=int, default=100, help="number of games to play")
+        command.add_argument("--lineup", default=None, help="lineup spec (see game.lineup) or 'module:callable'")
+        command.add_argument("--seed", type=int, default=None, help="base seed; game i gets game_seed(seed, i)")
+        command.add_argument("--shard-size", type=int, default=20, help="games per shard")
+        command.add_argument("--max-moves", type=int, default=DEFAULT_MAX_MOVES, help="move cap per game")
+        command.add_argument("--lease-timeout", type=float, default=600.0,
+                             help="seconds before an unfinished shard is handed to another worker")
+        command.add_argument("--max-attempts", type=int, default=3, help="tries per shard before giving up")
+        command.add_argument("--json", dest="json_path", default=None, help="write the full report to this file")
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=8765)
+    local.add_argument("--nodes", type=int, default=2, help="worker processes")
+
+    work = commands.add_parser("work", help="play shards from a coordinator")
+    work.add_argument("--url", required=True, help="coordinator address, e.g. http://10.0.0.5:8765")
+    work.add_argument("--processes", type=int, default=1, help="worker loops on this node")
+    for command in (work, local):
+        command.add_argument("--concurrency", type=int, default=1, help="concurrent games per worker")
+        command.add_argument("--record", dest="record_dir", default=None,
+                             help="record every game this node plays into this directory")
+        command.add_argument("--decision-cache", dest="cache_path", default=None,
+                             help="SQLite decision cache on this node")
+        command.add_argument("--results", dest="results_path", default=None,
+                             help="SQLite result store to add this node's games to")
+    args = parser.parse_args()
+
+    if args.command == "work":
+        workers = start_workers(args.url, args.processes, args.concurrency, args.record_dir, args.cache_path,
+                                args.results_path)
+        for process in workers:
+            process.join()
+        return
+
+    coordinator = Coordinator(args.games, args.lineup, args.seed, args.shard_size, args.max_moves,
+                              args.lease_timeout, args.max_attempts)
+    if args.command == "serve":
+        server = coordinator.serve(args.host, args.port)
+        print(f"Coordinating {args.games} games in {len(coordinator.shards)} shards on port {args.port}")
+        _wait_and_report(coordinator, args.json_path)
+        time.sleep(3.0)  # Let idle workers poll once more and learn that the tournament is over
+        server.shutdown()
+        return
+
+    server = coordinator.serve("127.0.0.1", 0)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    workers = start_workers(url, args.nodes, args.concurrency, args.record_dir, args.cache_path, args.results_path)
+    _wait_and_report(coordinator, args.json_path)
+    for process in workers:
+        process.join()
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
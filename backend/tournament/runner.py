@@ -0,0 +1,313 @@
+"""
+Headless tournament runner.
+
+Drives GameEngine directly, without a websocket and without any delay between
+moves, and spreads the games across a pool of worker processes.
+
+Usage (from the backend directory):
+    python -m tournament --games 1000 --workers 8
+    python -m tournament --games 200 --lineup random,greedy,mcts:200,random
+    python -m tournament --games 200 --lineup my_lineups:cpu_only
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from itertools import repeat
+from typing import Callable, Dict, List, Optional, Tuple
+
+from game import metrics
+from game.cache import DecisionCache
+from game.engine import GameEngine, MAX_SEED
+from game.lineup import Lineup, DEFAULT_LINEUP, is_lineup_spec
+from game.replay import ReplayWriter, ReplayReader
+from game.results import ResultStore, game_result, format_leaderboard
+from game.models import PlayerColor
+from game.providers import client_pool
+
+DEFAULT_MAX_MOVES = 500  # Games that run longer than this are scored as unfinished
+
+@dataclass
+class GameResult:
+    game_index: int
+    winner: Optional[str]
+    lineup: Dict[str, str]  # seat color -> model type
+    moves: int
+    duration: float
+    error: Optional[str] = None
+    seed: Optional[int] = None
+
+@dataclass
+class TournamentReport:
+    results: List[GameResult]
+    duration: float
+    seed: Optional[int] = None
+
+    @property
+    def games(self) -> int:
+        return len(self.results)
+
+    @property
+    def finished(self) -> int:
+        return sum(1 for r in self.results if r.winner)
+
+    @property
+    def errors(self) -> int:
+        return sum(1 for r in self.results if r.error)
+
+    def seat_win_rates(self) -> Dict[str, float]:
+        """Fraction of games won by each seat."""
+        wins = Counter(r.winner for r in self.results if r.winner)
+        return {color.value: wins[color.value] / self.games if self.games else 0.0
+                for color in PlayerColor}
+
+    def model_win_rates(self) -> Dict[str, float]:
+        """Fraction of seats played by each model that ended in a win."""
+        seats = Counter()
+        wins = Counter()
+        for result in self.results:
+            for color, model in result.lineup.items():
+                seats[model] += 1
+                if result.winner == color:
+                    wins[model] += 1
+        return {model: wins[model] / count for model, count in seats.items()}
+
+    def to_dict(self) -> Dict:
+        return {
+            "games": self.games,
+            "finished": self.finished,
+            "errors": self.errors,
+            "duration": self.duration,
+            "seed": self.seed,
+            "seatWinRates": self.seat_win_rates(),
+            "modelWinRates": self.model_win_rates(),
+            "results": [asdict(r) for r in self.results]
+        }
+
+    def format(self) -> str:
+        games_per_hour = self.games / self.duration * 3600 if self.duration else 0.0
+        lines = [
+            f"Games: {self.games} ({self.finished} finished, {self.errors} errors) "
+            f"in {self.duration:.1f}s ({games_per_hour:,.0f} games/hour), seed {self.seed}",
+            "Win rate per seat:"
+        ]
+        lines += [f"  {seat:<8} {rate:6.1%}" for seat, rate in self.seat_win_rates().items()]
+        lines.append("Win rate per model:")
+        lines += [f"  {model:<28} {rate:6.1%}"
+                  for model, rate in sorted(self.model_win_rates().items(), key=lambda x: -x[1])]
+        return "\n".join(lines)
+
+def load_lineup(spec: Optional[str]) -> Callable:
+    """
+    Resolve a lineup: a lineup spec such as 'random,greedy,mcts:200,random' (see
+    game.lineup), or a 'module:callable' player factory. None selects the default
+    lineup. Lineup specs build their players once and reuse them for every game.
+    """
+    if not spec:
+        return Lineup(DEFAULT_LINEUP).players
+    if is_lineup_spec(spec):
+        return Lineup(spec).players
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"Lineup must be a lineup spec or 'module:callable', got {spec!r}")
+    return getattr(importlib.import_module(module_name), attr)
+
+def game_seed(base_seed: int, game_index: int) -> int:
+    """The seed of one game in a tournament, the same whichever worker plays it."""
+    return random.Random(f"{base_seed}/{game_index}").randrange(MAX_SEED)
+
+async def play_game(game_index: int, make_players: Callable, max_moves: int = DEFAULT_MAX_MOVES,
+                    record_dir: Optional[str] = None, cache: Optional[DecisionCache] = None,
+                    seed: Optional[int] = None, responses: Optional[Dict[int, Dict]] = None,
+                    results: Optional[ResultStore] = None) -> GameResult:
+    """
+    Play a single game to completion (or max_moves) without a websocket.
+
+    Given the same seed and lineup, a game of built-in players plays out
+    identically; model players need their recorded responses (see rerun_game).
+    """
+    start = time.perf_counter()
+    lineup = {}
+    moves = 0
+    recorder = None
+    try:
+        engine = GameEngine(make_players(), seed=seed)
+        seed = engine.seed
+        engine.responses = responses
+        lineup = {color.value: player.model_type for color, player in engine.state.players.items()}
+        if cache:
+            for player in engine.state.players.values():
+                player.cache = cache
+        if record_dir:
+            recorder = ReplayWriter(os.path.join(record_dir, f"game-{game_index:06d}.jsonl"))
+            recorder.start(engine.state)
+            engine.recorder = recorder
+
+        while not engine._check_game_over() and moves < max_moves:
+            await engine.play_turn()
+            moves += 1
+
+        winner = engine.get_winner()
+        if recorder:
+            recorder.finish(winner)
+        if results:
+            results.record(game_result(engine, "tournament", time.perf_counter() - start))
+        return GameResult(game_index, winner.value if winner else None, lineup, moves,
+                          time.perf_counter() - start, seed=seed)
+    except Exception as e:
+        return GameResult(game_index, None, lineup, moves, time.perf_counter() - start, error=repr(e), seed=seed)
+    finally:
+        if recorder:
+            recorder.close()
+
+async def rerun_game(path: str, make_players: Callable,
+                     max_moves: int = DEFAULT_MAX_MOVES) -> Tuple[GameResult, Optional[int]]:
+    """
+    Play a recorded game again from its seed, with model players given their
+    recorded replies instead of calling their providers. Returns the result
+    and the first turn that went differently from the record, or None if the
+    game replayed exactly.
+    """
+    reader = ReplayReader(path)
+    recorded = reader.responses()
+    start = time.perf_counter()
+    engine = GameEngine(make_players(), seed=reader.seed)
+    engine.responses = recorded
+    lineup = {color.value: player.model_type for color, player in engine.state.players.items()}
+    divergence = -1 if engine.state.board.to_data() != reader.initial_board().to_data() else None
+
+    moves = 0
+    while not engine._check_game_over() and moves < max_moves:
+        executed = await engine.play_turn()
+        record = recorded.get(moves)
+        replayed = list(engine.last_move) if executed else None
+        if divergence is None and (record is None or record["ok"] != executed
+                                   or (executed and record["move"] != replayed)):
+            divergence = moves
+        moves += 1
+    if divergence is None and moves != reader.turns:
+        divergence = min(moves, reader.turns)
+
+    winner = engine.get_winner()
+    result = GameResult(-1, winner.value if winner else None, lineup, moves, time.perf_counter() - start,
+                        seed=reader.seed)
+    return result, divergence
+
+async def _play_games(indices: List[int], lineup: Optional[str], max_moves: int, concurrency: int,
+                      record_dir: Optional[str], cache_path: Optional[str], base_seed: int,
+                      results_path: Optional[str]) -> List[GameResult]:
+    make_players = load_lineup(lineup)
+    semaphore = asyncio.Semaphore(concurrency)
+    cache = DecisionCache(path=cache_path) if cache_path else None
+    results = ResultStore(results_path) if results_path else None
+
+    async def play(game_index: int) -> GameResult:
+        async with semaphore:
+            return await play_game(game_index, make_players, max_moves, record_dir, cache,
+                                   seed=game_seed(base_seed, game_index), results=results)
+
+    try:
+        with metrics.profiled(f"tournament-{os.getpid()}-{indices[0]:06d}"):
+            return await asyncio.gather(*(play(i) for i in indices))
+    finally:
+        if cache:
+            cache.close()
+        if results:
+            results.close()
+        await client_pool.aclose()
+
+def _play_chunk(indices: List[int], lineup: Optional[str], max_moves: int, concurrency: int,
+                record_dir: Optional[str] = None, cache_path: Optional[str] = None,
+                base_seed: int = 0, results_path: Optional[str] = None) -> List[GameResult]:
+    """Worker process entry point: play a chunk of games on a fresh event loop."""
+    return asyncio.run(_play_games(indices, lineup, max_moves, concurrency, record_dir, cache_path, base_seed,
+                                   results_path))
+
+def run_tournament(num_games: int, lineup: Optional[str] = None, workers: Optional[int] = None,
+                   max_moves: int = DEFAULT_MAX_MOVES, concurrency: int = 1,
+                   chunk_size: Optional[int] = None, record_dir: Optional[str] = None,
+                   cache_path: Optional[str] = None, seed: Optional[int] = None,
+                   results_path: Optional[str] = None) -> TournamentReport:
+    """
+    Play num_games games across a pool of worker processes.
+
+    Each worker runs up to `concurrency` games at once on its own event loop, which
+    keeps network-bound model players busy while CPU-bound players use one game per
+    process. With workers=1 everything runs in the calling process. If record_dir
+    is given, every game is recorded there as game-NNNNNN.jsonl (see game.replay).
+    cache_path names a SQLite decision cache shared by all workers (see game.cache),
+    and results_path a result store that every game is added to (see game.results).
+
+    Game i is seeded with game_seed(seed, i), so any game of the run can be
+    replayed alone; without a seed one is drawn and kept in the report.
+    """
+    workers = workers or os.cpu_count() or 1
+    seed = seed if seed is not None else random.randrange(2 ** 32)
+    if record_dir:
+        os.makedirs(record_dir, exist_ok=True)
+    chunk_size = chunk_size or max(1, -(-num_games // (workers * 4)))
+    chunks = [list(range(i, min(i + chunk_size, num_games)))
+              for i in range(0, num_games, chunk_size)]
+
+    start = time.perf_counter()
+    results: List[GameResult] = []
+    if workers == 1:
+        for chunk in chunks:
+            results.extend(_play_chunk(chunk, lineup, max_moves, concurrency, record_dir, cache_path, seed,
+                                       results_path))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk_results in pool.map(_play_chunk, chunks, repeat(lineup), repeat(max_moves),
+                                          repeat(concurrency), repeat(record_dir), repeat(cache_path),
+                                          repeat(seed), repeat(results_path)):
+                results.extend(chunk_results)
+
+    return TournamentReport(results=results, duration=time.perf_counter() - start, seed=seed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a headless So Long Sucker tournament.")
+    parser.add_argument("--games", type=int, default=100, help="number of games to play")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--concurrency", type=int, default=1, help="concurrent games per worker")
+    parser.add_argument("--max-moves", type=int, default=DEFAULT_MAX_MOVES, help="move cap per game")
+    parser.add_argument("--lineup", default=None,
+                        help="lineup spec such as 'red=mcts:200,blue=greedy,green=random,yellow=random' "
+                             "(see game.lineup) or a player factory as 'module:callable'")
+    parser.add_argument("--json", dest="json_path", default=None, help="write the full report to this file")
+    parser.add_argument("--record", dest="record_dir", default=None, help="record every game into this directory")
+    parser.add_argument("--decision-cache", dest="cache_path", default=None,
+                        help="SQLite file caching model decisions across games and runs")
+    parser.add_argument("--results", dest="results_path", default=None,
+                        help="SQLite result store to add every game to, e.g. the server's results.db")
+    parser.add_argument("--seed", type=int, default=None, help="base seed; game i gets game_seed(seed, i)")
+    parser.add_argument("--rerun", default=None, metavar="RECORD",
+                        help="replay one recorded game (see --record) with the given --lineup and report "
+                             "where it diverges")
+    args = parser.parse_args()
+
+    if args.rerun:
+        result, divergence = asyncio.run(rerun_game(args.rerun, load_lineup(args.lineup), args.max_moves))
+        print(f"Replayed {result.moves} turns with seed {result.seed}: winner {result.winner}")
+        print("Identical to the record" if divergence is None else f"Diverged from the record at turn {divergence}")
+        return
+
+    report = run_tournament(args.games, lineup=args.lineup, workers=args.workers,
+                            max_moves=args.max_moves, concurrency=args.concurrency,
+                            record_dir=args.record_dir, cache_path=args.cache_path, seed=args.seed,
+                            results_path=args.results_path)
+    print(report.format())
+    if args.results_path:
+        print(format_leaderboard(ResultStore(args.results_path).leaderboard()))
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report.to_dict(), f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -12,22 +12,95 @@ type GameState = {
     defeatedPlayers: string[];
   };
   
+  type ChipData = { color: string; owner: string };
+
+  // Moves arrive as deltas against the last snapshot; see backend/api/protocol.py
+  type GameEvent =
+    | { type: 'play'; player: string; chip: string; pile: number }
+    | { type: 'capture'; pile: number; player: string; captured: string | null }
+    | { type: 'transfer'; from: string; to: string; chip: string }
+    | { type: 'defeated'; player: string }
+    | { type: 'turn'; player: string };
+
+  type ServerMessage =
+    | { type: 'snapshot'; seq: number; state: GameState }
+    | { type: 'delta'; seq: number; events: GameEvent[] }
+    | { type: 'error'; message: string };
+
   type WebSocketCallback = (gameState: GameState) => void;
+
+  const COLOR_ORDER = ['red', 'blue', 'green', 'yellow'];
+
+  const takeChip = (chips: ChipData[], color: string) => {
+    const index = chips.findIndex(chip => chip.color === color);
+    if (index >= 0) {
+      chips.splice(index, 1);
+    }
+  };
+
+  const giveChip = (chips: ChipData[], color: string) => {
+    chips.push({ color, owner: color });
+    chips.sort((a, b) => COLOR_ORDER.indexOf(a.color) - COLOR_ORDER.indexOf(b.color));
+  };
+
+  const applyEvents = (state: GameState, events: GameEvent[]): GameState => {
+    const players: GameState['players'] = {};
+    for (const [color, player] of Object.entries(state.players)) {
+      players[color] = { ...player, chips: [...player.chips] };
+    }
+    const piles = state.piles.map(pile => [...pile]);
+    const defeatedPlayers = [...state.defeatedPlayers];
+    let currentTurn = state.currentTurn;
+
+    for (const event of events) {
+      switch (event.type) {
+        case 'play':
+          takeChip(players[event.player].chips, event.chip);
+          while (piles.length <= event.pile) {
+            piles.push([]);
+          }
+          piles[event.pile].push({ color: event.chip, owner: event.chip });
+          break;
+        case 'capture':
+          piles[event.pile].splice(-2, 2);
+          if (event.captured) {
+            giveChip(players[event.player].chips, event.captured);
+          }
+          break;
+        case 'transfer':
+          takeChip(players[event.from].chips, event.chip);
+          giveChip(players[event.to].chips, event.chip);
+          break;
+        case 'defeated':
+          players[event.player].defeated = true;
+          defeatedPlayers.push(event.player);
+          break;
+        case 'turn':
+          currentTurn = event.player;
+          break;
+      }
+    }
+
+    return { players, piles, currentTurn, defeatedPlayers };
+  };
   
   class GameWebSocket {
     private ws: WebSocket | null = null;
     private callbacks: WebSocketCallback[] = [];
+    private gameId = 'default';
+    private state: GameState | null = null;
+    private seq = 0;
   
-    connect() {
-      this.ws = new WebSocket('ws://localhost:8000/ws');
+    connect(gameId: string = this.gameId) {
+      this.gameId = gameId;
+      this.ws = new WebSocket(`ws://localhost:8000/ws/${encodeURIComponent(gameId)}`);
   
       this.ws.onopen = () => {
         console.log('Connected to game server');
       };
   
       this.ws.onmessage = (event) => {
-        const gameState: GameState = JSON.parse(event.data);
-        this.notifyCallbacks(gameState);
+        this.handleMessage(JSON.parse(event.data));
       };
   
       this.ws.onerror = (error) => {
@@ -41,9 +114,40 @@ type GameState = {
       };
     }
   
-    startGame() {
+    private handleMessage(message: ServerMessage) {
+      switch (message.type) {
+        case 'snapshot':
+          this.state = message.state;
+          this.seq = message.seq;
+          this.notifyCallbacks(this.state);
+          break;
+        case 'delta':
+          if (!this.state || message.seq <= this.seq) {
+            return;  // Already reflected in the snapshot we hold
+          }
+          if (message.seq !== this.seq + 1) {
+            this.requestGameState();  // Missed a delta, resynchronise
+            return;
+          }
+          this.state = applyEvents(this.state, message.events);
+          this.seq = message.seq;
+          this.notifyCallbacks(this.state);
+          break;
+        case 'error':
+          console.error('Game server error:', message.message);
+          break;
+      }
+    }
+
+    // lineup: player type per seat, e.g. "random,greedy,mcts:200,random"; the server default if omitted.
+    // seed: replays an earlier game exactly (see /games); a random seed if omitted.
+    startGame(lineup?: string | Record<string, string>, seed?: number) {
       if (this.ws?.readyState === WebSocket.OPEN) {
-        this.ws.send(JSON.stringify({ type: 'start_game' }));
+        this.ws.send(JSON.stringify({
+          type: 'start_game',
+          ...(lineup ? { lineup } : {}),
+          ...(seed !== undefined ? { seed } : {})
+        }));
       }
     }
   